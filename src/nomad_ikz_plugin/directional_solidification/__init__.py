@@ -50,6 +50,38 @@ manual_protocol_parser = DirSolManualProtocolParserEntryPoint(
 
 
 class DirSolDigitalProtocolParserEntryPoint(ParserEntryPoint):
+    csv_chunk_rows: int = Field(
+        100_000,
+        description='The number of rows of the csv file read at once. Only one chunk '
+        'of rows is kept in memory while the HDF5 file is written.',
+    )
+    hdf5_compression: str | None = Field(
+        'gzip',
+        description='The compression of the channels in the HDF5 file, `gzip`, `lzf` '
+        'or `None` to store them uncompressed.',
+    )
+    hdf5_compression_level: int = Field(
+        4,
+        description='The level of the `gzip` compression from 0 to 9.',
+    )
+    hdf5_chunk_rows: int = Field(
+        3600,
+        description='The number of rows of the chunks of the channels in the HDF5 '
+        'file. Reading a time range only reads the chunks overlapping it.',
+    )
+    hdf5_float32_resolution: dict[str, float] = Field(
+        {},
+        description='The resolution of the channels stored as float32 by the name of '
+        'their group, e.g. `{"t12": 0.1}`. A chunk of a channel is stored as float32 if '
+        'this keeps its values within half the resolution, so they are recovered by '
+        'rounding. All other channels are stored as float64.',
+    )
+    hdf5_pyramid_levels: list[int] = Field(
+        [10, 100, 1000],
+        description='The decimation factors of the min/max/mean pyramid of the '
+        'channels written to the `/pyramid` group of the HDF5 file for previews.',
+    )
+
     def load(self):
         from nomad_ikz_plugin.directional_solidification.parser import (
             DSDigitalProtocolParserIKZ,
@@ -15,12 +15,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+import hashlib
 import io
-from collections.abc import Iterable
+import os
+from collections.abc import Iterable, Iterator
 from datetime import datetime
 from typing import Union
 from zoneinfo import ZoneInfo
 import h5py
+from nomad.config import config
 
 from nomad.datamodel.hdf5 import HDF5Reference
 from nomad.metainfo import (
@@ -63,10 +66,42 @@ from nomad_ikz_plugin.directional_solidification.schema import (
 )
 from nomad_ikz_plugin.utils import (
     create_archive,
+    open_excel,
+    read_excel_sheet,
 )
 
 timezone = 'Europe/Berlin'
 
+DIGITAL_PROTOCOL_TIME_COLUMN = 'T Ist H1 Time'
+DIGITAL_PROTOCOL_TIME_FORMAT = '%d.%m.%Y %H:%M:%S'
+CSV_BLOCK_BYTES = 1 << 20
+CLOCK_ATTRIBUTES = ['start', 'wall_clock', 'step_back']
+
+MANUAL_PROTOCOL_HEATERS = 9
+MANUAL_PROTOCOL_COLUMNS = [
+    # The columns of the manual protocol sheet used by the parser
+    'Ending time',
+    'T12',
+    'T13',
+    'T14',
+    'Tpyr',
+    'Ttp',
+    *(
+        f'{quantity}{heater + 1}{coil}'
+        for heater in range(MANUAL_PROTOCOL_HEATERS)
+        for quantity, coil in [
+            ('f', '_F1'),
+            ('f', '_F2'),
+            ('phi', '_F1'),
+            ('phi', '_F2'),
+            ('Iac', '_F1'),
+            ('Iac', '_F2'),
+            ('Iges', ''),
+            ('P', ''),
+        ]
+    ),
+]
+
 
 def fill_datetime(date: pd.Series):
     date_array = []
@@ -80,14 +115,368 @@ def fill_datetime(date: pd.Series):
     return date_array
 
 
+def digital_protocol_column(column: str) -> bool:
+    """
+    Selects the columns of the digital protocol that are read. Every channel repeats
+    the time stamps, so only the ones of the first heater are kept.
+    """
+    return 'Time' not in column or DIGITAL_PROTOCOL_TIME_COLUMN in column
+
+
+def read_digital_protocol(
+    file, chunk_rows: int, names: list[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads the digital protocol csv with the C parser in chunks of `chunk_rows` rows,
+    skipping the repeated time columns. The slashes in the channel names are replaced
+    by spaces. If the `names` of the columns are given, the file is read from its
+    current position without a header line.
+    """
+    with pd.read_csv(
+        file,
+        sep=';',
+        decimal=',',
+        header=None if names else 'infer',
+        names=names,
+        usecols=digital_protocol_column,
+        chunksize=chunk_rows,
+    ) as reader:
+        for df_csv in reader:
+            yield df_csv.rename(columns=lambda column: column.replace('/', ' '))
+
+
+def complete_lines_size(path) -> int:
+    """
+    Returns the number of bytes of the file up to and including its last complete
+    line. A line after the last line break may still be written by the furnace
+    software, so it is only complete if it has as many separators as the header, e.g.
+    the last line of a finished protocol without a trailing line break.
+    """
+    with open(path, 'rb') as file:
+        separators = file.readline().count(b';')
+        size = end = file.seek(0, os.SEEK_END)
+        lines_end = 0
+        while end > 0:
+            start = max(end - CSV_BLOCK_BYTES, 0)
+            file.seek(start)
+            line_break = file.read(end - start).rfind(b'\n')
+            if line_break >= 0:
+                lines_end = start + line_break + 1
+                break
+            end = start
+        file.seek(lines_end)
+        last_line = file.read()
+    if last_line.strip() and last_line.count(b';') == separators:
+        return size
+    return lines_end
+
+
+class FileRange(io.RawIOBase):
+    """
+    Reads a binary file from its current position up to the byte `end`, updating the
+    hash `sha256` with the bytes read.
+    """
+
+    def __init__(self, file, end: int, sha256):
+        self.file = file
+        self.end = end
+        self.sha256 = sha256
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.file.read(max(min(len(buffer), self.end - self.file.tell()), 0))
+        buffer[: len(data)] = data
+        self.sha256.update(data)
+        return len(data)
+
+
+class ProtocolClock:
+    """
+    Converts the time stamps of the digital protocol into the seconds elapsed since
+    the first one, keeping the state needed to convert the protocol chunk by chunk.
+
+    Attributes:
+        start (int): The first time stamp in UTC nanoseconds.
+        wall_clock (int): The last time stamp as local time in nanoseconds.
+        step_back (int): The local time in nanoseconds after the last step back of the
+            clock, or an hour before the first time stamp if there was none.
+    """
+
+    def __init__(self, start=None, wall_clock=None, step_back=None):
+        self.start = start
+        self.wall_clock = wall_clock
+        self.step_back = step_back
+
+    def elapsed_seconds(self, time_column: pd.Series) -> np.ndarray:
+        timestamps = pd.to_datetime(time_column, format=DIGITAL_PROTOCOL_TIME_FORMAT)
+        wall_clock = timestamps.to_numpy('datetime64[ns]').view(np.int64)
+        if len(wall_clock) == 0:
+            return np.array([], dtype=np.float64)
+        hour = pd.Timedelta(hours=1).value
+        if self.wall_clock is None:
+            self.wall_clock = wall_clock[0]
+            self.step_back = wall_clock[0] - hour
+        # The time stamps are local time: in the hour repeated at the end of daylight
+        # saving time, the ones within an hour after the clock stepped back are
+        # standard time.
+        previous = np.concatenate([[self.wall_clock], wall_clock[:-1]])
+        steps_back = np.flatnonzero(wall_clock < previous)
+        last_step_back = np.searchsorted(
+            steps_back, np.arange(len(wall_clock)), 'right'
+        )
+        after_step_back = np.concatenate([[self.step_back], wall_clock[steps_back]])[
+            last_step_back
+        ]
+        timestamps = timestamps.dt.tz_localize(
+            timezone,
+            ambiguous=wall_clock - after_step_back >= hour,
+            nonexistent='shift_forward',
+        )
+        nanoseconds = (
+            timestamps.dt.tz_convert(None).to_numpy('datetime64[ns]').view(np.int64)
+        )
+        if self.start is None:
+            self.start = nanoseconds[0]
+        self.wall_clock = wall_clock[-1]
+        self.step_back = after_step_back[-1]
+        return (nanoseconds - self.start) / 1e9
+
+
+class ProtocolProgress:
+    """
+    The part of the digital protocol csv converted into the HDF5 file. It is stored
+    in the attributes of the HDF5 file, so that only the new rows are converted when
+    the csv grew during a run.
+
+    Attributes:
+        size (int): The number of bytes of the csv converted.
+        rows (int): The number of rows converted.
+        sha256: The SHA-256 hash of the converted bytes.
+        clock (ProtocolClock): The clock after the last converted row.
+    """
+
+    def __init__(self, size=0, rows=0, sha256=None, clock=None):
+        self.size = size
+        self.rows = rows
+        self.sha256 = sha256 or hashlib.sha256()
+        self.clock = clock or ProtocolClock()
+
+    @classmethod
+    def from_hdf5(cls, hdf: h5py.File, path) -> 'ProtocolProgress | None':
+        """
+        Returns the progress stored in the HDF5 file, or `None` if the csv does not
+        start with the converted bytes anymore or the file was not completely written.
+        """
+        attrs = hdf.attrs
+        if 'csv_size' not in attrs or '/all_parameters/time' not in hdf:
+            return None
+        size = int(attrs['csv_size'])
+        rows = int(attrs['csv_rows'])
+        if os.path.getsize(path) < size or len(hdf['/all_parameters/time']) != rows:
+            return None
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as file:
+            while file.tell() < size:
+                sha256.update(file.read(min(CSV_BLOCK_BYTES, size - file.tell())))
+        if sha256.hexdigest() != attrs['csv_sha256']:
+            return None
+        clock = ProtocolClock(
+            *(attrs.get(f'clock_{name}') for name in CLOCK_ATTRIBUTES)
+        )
+        return cls(size, rows, sha256, clock)
+
+    def read_csv(self, path, size: int, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        """
+        Reads the rows of the csv after the converted bytes up to the byte `size` in
+        chunks of `chunk_rows` rows, adding them to the progress.
+        """
+        if size <= self.size:
+            return
+        names = None
+        if self.size > 0:
+            names = pd.read_csv(path, sep=';', nrows=0).columns.tolist()
+        with open(path, 'rb') as file:
+            file.seek(self.size)
+            csv_range = io.BufferedReader(FileRange(file, size, self.sha256))
+            for df_csv in read_digital_protocol(csv_range, chunk_rows, names):
+                if df_csv.empty:
+                    # only the line break after a last line converted without it
+                    continue
+                self.rows += len(df_csv)
+                yield df_csv
+        self.size = size
+
+    def to_hdf5(self, hdf: h5py.File) -> None:
+        hdf.attrs['csv_size'] = self.size
+        hdf.attrs['csv_rows'] = self.rows
+        hdf.attrs['csv_sha256'] = self.sha256.hexdigest()
+        for name in CLOCK_ATTRIBUTES:
+            if getattr(self.clock, name) is not None:
+                hdf.attrs[f'clock_{name}'] = getattr(self.clock, name)
+
+
+def channel_dataset(
+    values: np.ndarray, configuration, resolution: float | None = None
+) -> dict:
+    """
+    Returns the arguments of `create_dataset` storing a channel of the digital
+    protocol in a resizable dataset with the chunking and compression of the parser
+    `configuration`. Float values are downcast to float32 if this keeps them within
+    half the `resolution` of the channel. Non-numeric channels are not compressed.
+    """
+    options = {
+        'data': values,
+        'chunks': (configuration.hdf5_chunk_rows,),
+        'maxshape': (None,),
+    }
+    if values.dtype.kind not in 'iuf':
+        return options
+    if resolution is not None and values.dtype.kind == 'f':
+        with np.errstate(over='ignore'):
+            values_32 = values.astype(np.float32)
+        if np.allclose(values_32, values, rtol=0, atol=resolution / 2, equal_nan=True):
+            options['data'] = values_32
+    if configuration.hdf5_compression is not None:
+        options['compression'] = configuration.hdf5_compression
+        options['shuffle'] = True
+        if configuration.hdf5_compression == 'gzip':
+            options['compression_opts'] = configuration.hdf5_compression_level
+    return options
+
+
+def append_channel(
+    group: h5py.Group,
+    name: str,
+    values: np.ndarray,
+    configuration,
+    resolution: float | None = None,
+) -> h5py.Dataset:
+    """
+    Appends the values of a chunk of the digital protocol to the channel dataset
+    `name` of the group, creating it for the first chunk. If the chunk needs a wider
+    type than the previous ones, e.g. floats after integers, the dataset is rewritten
+    with the common type.
+    """
+    options = channel_dataset(values, configuration, resolution)
+    values = options.pop('data')
+    if name not in group:
+        return group.create_dataset(name, data=values, **options)
+    dataset = group[name]
+    dtype = np.result_type(dataset.dtype, values.dtype)
+    if dtype != dataset.dtype:
+        previous = dataset[()].astype(dtype)
+        del group[name]
+        dataset = group.create_dataset(name, data=previous, **options)
+    length = len(dataset)
+    dataset.resize((length + len(values),))
+    dataset[length:] = values
+    return dataset
+
+
+def link_dataset(hdf: h5py.File, path: str, target: str) -> None:
+    """
+    Links the dataset `target` at `path`, replacing a link to another dataset, e.g. to
+    one rewritten by `append_channel`.
+    """
+    if path in hdf:
+        if hdf[path] == hdf[target]:
+            return
+        del hdf[path]
+    hdf[path] = hdf[target]
+
+
+def bucket_statistics(values: np.ndarray, level: int) -> dict[str, np.ndarray]:
+    """
+    Returns the min, max and mean of the values in buckets of `level` values, ignoring
+    NaN. The last bucket may be shorter.
+    """
+    buckets = np.arange(0, len(values), level)
+    valid = (
+        ~np.isnan(values)
+        if values.dtype.kind == 'f'
+        else np.ones(len(values), dtype=bool)
+    )
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(
+            np.where(valid, values, 0).astype(np.float64), buckets
+        ) / np.add.reduceat(valid, buckets)
+    return {
+        'min': np.fmin.reduceat(values, buckets),
+        'max': np.fmax.reduceat(values, buckets),
+        'mean': mean,
+    }
+
+
+def write_pyramid(hdf: h5py.File, configuration, start_row: int) -> None:
+    """
+    Writes the min/max/mean pyramid of the numeric channels of `/all_parameters` to
+    the groups `/pyramid/<level>/<channel>` for the levels of the parser
+    `configuration`, with the mean time of the buckets in `/pyramid/<level>/time`.
+    The buckets from the one containing `start_row` on are rewritten, reading the
+    channels in blocks of about as many rows as the chunks of the csv.
+    """
+    levels = configuration.hdf5_pyramid_levels
+    if not levels:
+        return
+    all_params = hdf['all_parameters']
+    channels = {
+        name: group['value']
+        for name, group in all_params.items()
+        if isinstance(group, h5py.Group) and group['value'].dtype.kind in 'iuf'
+    }
+    rows = len(all_params['time'])
+    if any(f'pyramid/{level}' not in hdf for level in levels):
+        start_row = 0
+    # the blocks start at the first row of a bucket of every level
+    step = int(np.lcm.reduce(levels))
+    start_row = start_row // step * step
+    block_rows = max(configuration.csv_chunk_rows // step, 1) * step
+    for level in levels:
+        for path in [
+            f'pyramid/{level}',
+            *(f'pyramid/{level}/{name}' for name in channels),
+        ]:
+            for dataset in hdf.require_group(path).values():
+                if isinstance(dataset, h5py.Dataset):
+                    dataset.resize((start_row // level,))
+    for start in range(start_row, rows, block_rows):
+        block = slice(start, min(start + block_rows, rows))
+        time = all_params['time'][block]
+        for level in levels:
+            append_channel(
+                hdf[f'pyramid/{level}'],
+                'time',
+                bucket_statistics(time, level)['mean'],
+                configuration,
+            )
+        for name, dataset in channels.items():
+            values = dataset[block]
+            resolution = configuration.hdf5_float32_resolution.get(name)
+            for level in levels:
+                group = hdf[f'pyramid/{level}/{name}']
+                for statistic, data in bucket_statistics(values, level).items():
+                    append_channel(group, statistic, data, configuration, resolution)
+    for level in levels:
+        for name in channels:
+            group = hdf[f'pyramid/{level}/{name}']
+            group.attrs['NX_class'] = 'NXdata'
+            group.attrs['axes'] = 'time'
+            group.attrs['signal'] = 'mean'
+            group.attrs['auxiliary_signals'] = ['min', 'max']
+            link_dataset(hdf, f'/pyramid/{level}/{name}/time', f'/pyramid/{level}/time')
+
+
 class DSManualProtocolParserIKZ(MatchingParser):
     def parse(self, mainfile: str, archive: EntryArchive, logger) -> None:
         data_file = mainfile.split('/')[-1]
         data_file_with_path = mainfile.split('raw/')[-1]
-        xlsx = pd.ExcelFile(mainfile)
-        xlsx_sheet = pd.read_excel(
+        xlsx = open_excel(mainfile)
+        xlsx_sheet = read_excel_sheet(
             xlsx,
             'Sheet1',
+            columns=MANUAL_PROTOCOL_COLUMNS,
             comment='#',
         )
 
@@ -156,7 +545,7 @@ class DSManualProtocolParserIKZ(MatchingParser):
             ureg('s'),
         )
 
-        heater_number = 9
+        heater_number = MANUAL_PROTOCOL_HEATERS
         for heater in range(heater_number):
             dig_prot_data.heaters.append(HeaterParameters())
             dig_prot_data.heaters[heater].name = f'heater {heater + 1}'
@@ -281,35 +670,12 @@ class DSDigitalProtocolParserIKZ(MatchingParser):
         archive: EntryArchive,
         logger,
     ) -> None:
+        configuration = config.get_plugin_entry_point(
+            'nomad_ikz_plugin.directional_solidification:digital_protocol_parser'
+        )
         data_file = mainfile.split('/')[-1]
         data_file_with_path = mainfile.split('raw/')[-1]
 
-        df_csv = pd.read_csv(mainfile, sep=';', decimal=',', engine='python')
-        # delete the repeated Time columns in csv
-        for df in df_csv:
-            if 'Time' in df and 'T Ist H1 Time' not in df:
-                del df_csv[df]
-        for df in df_csv:
-            if '/' in df:
-                new_i = df.replace('/', ' ')
-                df_csv[new_i] = df_csv[df]
-                del df_csv[df]
-
-        start_time = datetime.strptime(
-            df_csv['T Ist H1 Time'][0],
-            '%d.%m.%Y %H:%M:%S',
-        ).replace(tzinfo=ZoneInfo(timezone))
-        timestamp = [
-            (
-                datetime.strptime(
-                    dt,
-                    '%d.%m.%Y %H:%M:%S',
-                ).replace(tzinfo=ZoneInfo(timezone))
-            )
-            for dt in df_csv['T Ist H1 Time']
-        ]
-        elapsed_time = np.array([(dt - start_time).total_seconds() for dt in timestamp])
-
         filetype = 'yaml'
         digi_protocol_filename = f'{data_file[:-4]}.archive.{filetype}'
 
@@ -344,29 +710,67 @@ class DSDigitalProtocolParserIKZ(MatchingParser):
         # create a simple, plain, hdf5 file
         hdf_filename = f'{data_file[:-4]}.h5'
         heater_number = 9
-        with archive.m_context.raw_file(hdf_filename, 'w') as newfile:
+        csv_size = complete_lines_size(mainfile)
+        progress = None
+        if archive.m_context.raw_path_exists(hdf_filename):
+            with archive.m_context.raw_file(hdf_filename, 'rb') as oldfile:
+                with h5py.File(oldfile.name, 'r') as hdf:
+                    progress = ProtocolProgress.from_hdf5(hdf, mainfile)
+        # append the new rows if the csv still starts with the converted ones
+        with archive.m_context.raw_file(
+            hdf_filename, 'w' if progress is None else 'ab'
+        ) as newfile:
             with h5py.File(newfile.name, 'a') as hdf:
-                all_params = hdf.create_group('all_parameters')
-                all_params.create_dataset('time', data=elapsed_time)
-                hdf.attrs['NX_class'] = 'NXroot'
-                # all_params.attrs['NX_class'] = 'NXdata'
-                for _, df in df_csv.items():
-                    group_name = (
-                        df.name.replace('ValueY', '').strip().replace(' ', '_').lower()
+                if progress is None:
+                    progress = ProtocolProgress()
+                    hdf.create_group('all_parameters')
+                    hdf.attrs['NX_class'] = 'NXroot'
+                    # all_params.attrs['NX_class'] = 'NXdata'
+                all_params = hdf['all_parameters']
+                converted_rows = progress.rows
+                # only the current chunk of rows is kept in memory
+                for df_csv in progress.read_csv(
+                    mainfile, csv_size, configuration.csv_chunk_rows
+                ):
+                    append_channel(
+                        all_params,
+                        'time',
+                        progress.clock.elapsed_seconds(
+                            df_csv[DIGITAL_PROTOCOL_TIME_COLUMN]
+                        ),
+                        configuration,
                     )
-                    group = all_params.create_group(group_name)
-                    hdf[f'/all_parameters/{group_name}/time'] = hdf[
-                        '/all_parameters/time'
-                    ]
-                    group.create_dataset('value', data=df.values)
-                    group.attrs['NX_class'] = 'NXdata'
-                    group.attrs['axes'] = 'time'
-                    group.attrs['signal'] = 'value'
+                    for _, df in df_csv.items():
+                        group_name = (
+                            df.name.replace('ValueY', '')
+                            .strip()
+                            .replace(' ', '_')
+                            .lower()
+                        )
+                        if group_name not in all_params:
+                            group = all_params.create_group(group_name)
+                            group.attrs['NX_class'] = 'NXdata'
+                            group.attrs['axes'] = 'time'
+                            group.attrs['signal'] = 'value'
+                        append_channel(
+                            all_params[group_name],
+                            'value',
+                            df.to_numpy(),
+                            configuration,
+                            configuration.hdf5_float32_resolution.get(group_name),
+                        )
+                for name, group in all_params.items():
+                    if isinstance(group, h5py.Group):
+                        link_dataset(
+                            hdf,
+                            f'/all_parameters/{name}/time',
+                            '/all_parameters/time',
+                        )
 
                 # create the heater groups linking the existing datasets
                 for i in range(1, heater_number + 1):
-                    hdf.create_group(f'heater_{i}')
-                    hdf[f'/heater_{i}/time'] = hdf['/all_parameters/time']
+                    hdf.require_group(f'heater_{i}')
+                    link_dataset(hdf, f'/heater_{i}/time', '/all_parameters/time')
 
                 heaters_params = [
                     't_ist',
@@ -388,9 +792,13 @@ class DSDigitalProtocolParserIKZ(MatchingParser):
                         ):
                             heater_number = str(name)[-1]
                             group_name = f'heater_{heater_number}'
-                            hdf[f'/{group_name}/{name}'] = hdf[
-                                f'/all_parameters/{name}/value'
-                            ]
+                            link_dataset(
+                                hdf,
+                                f'/{group_name}/{name}',
+                                f'/all_parameters/{name}/value',
+                            )
+                write_pyramid(hdf, configuration, converted_rows)
+                progress.to_hdf5(hdf)
 
         digi_protocol_archive.data.temperature_1_2.time = f'/uploads/{archive.m_context.upload_id}/raw/{hdf_filename}#/all_parameters/t12/time'
         digi_protocol_archive.data.temperature_1_2.value = f'/uploads/{archive.m_context.upload_id}/raw/{hdf_filename}#/all_parameters/t12/value'
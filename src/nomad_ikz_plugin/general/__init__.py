@@ -1,8 +1,16 @@
+from typing import Literal
+
 from nomad.config.models.plugins import SchemaPackageEntryPoint
 from pydantic import Field
 
 
 class GeneralEntryPoint(SchemaPackageEntryPoint):
+    archive_format: Literal['yaml', 'json'] = Field(
+        'yaml',
+        description='The format of the archives created by a sample cut, '
+        '`yaml` or `json`.',
+    )
+
     def load(self):
         from nomad_ikz_plugin.general.schema import m_package
 
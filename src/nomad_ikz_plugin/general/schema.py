@@ -547,7 +547,7 @@ class SampleCutIKZ(Process, EntryData):
 
     def normalize(self, archive, logger):
         super().normalize(archive, logger)
-        filetype = 'yaml'
+        filetype = configuration.archive_format
         if not self.number_of_samples:
             logger.error(
                 "Error in SampleCut: 'number_of_samples' expected, but None found."
@@ -15,10 +15,19 @@
 # limitations under the License.
 #
 
+from typing import Literal
+
 from nomad.config.models.plugins import ParserEntryPoint
+from pydantic import Field
 
 
 class Movpe1ParserEntryPoint(ParserEntryPoint):
+    archive_format: Literal['yaml', 'json'] = Field(
+        'yaml',
+        description='The format of the archives created by the parser, '
+        '`yaml` or `json`.',
+    )
+
     def load(self):
         from nomad_ikz_plugin.movpe.movpe1.growth_excel.parser import ParserMovpe1IKZ
 
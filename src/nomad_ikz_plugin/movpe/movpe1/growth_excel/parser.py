@@ -16,10 +16,9 @@
 # limitations under the License.
 #
 import os
-import time
 
 import pandas as pd
-import yaml
+from nomad.config import config
 from nomad.datamodel.data import (
     EntryData,
 )
@@ -56,9 +55,20 @@ from nomad_ikz_plugin.movpe.schema import (
     ThinFilmStackMovpe,
 )
 from nomad_ikz_plugin.utils import (
+    archive_file_type,
     create_archive,
+    deserialize_archive,
+    index_by_lab_id,
+    open_excel,
+    read_excel_sheet,
+    search_lab_ids,
 )
 
+configuration = config.get_plugin_entry_point(
+    'nomad_ikz_plugin.movpe.movpe1.growth_excel:parser'
+)
+
+
 PARAMETER_SHEET_COLUMNS = {
     # A set of expected columns in the parameter sheet
     'Precursor',
@@ -157,14 +167,14 @@ class ParserMovpe1IKZ(MatchingParser):
     def parse(self, mainfile: str, archive: EntryArchive, logger) -> None:
         from nomad.search import MetadataPagination, search
 
-        filetype = 'yaml'
-        xlsx = pd.ExcelFile(mainfile)
+        filetype = configuration.archive_format
+        xlsx = open_excel(mainfile)
         data_file = mainfile.split('/')[-1]
         data_file_with_path = mainfile.split('raw/')[-1]
-        # Read the file without headers
-        parameter_sheet = pd.read_excel(
+        parameter_sheet = read_excel_sheet(
             xlsx,
             'Ti Sr Parameter',
+            columns=PARAMETER_SHEET_COLUMNS,
             comment='#',  # , header=None
             nrows=10000,
         )
@@ -179,39 +189,53 @@ class ParserMovpe1IKZ(MatchingParser):
 
         deposition_control_list = []
 
+        # find the growth run archives parsed by the rcp parser.
+        # The recognition is based on the folder name where the rcp file was contained in.
+        # Waits for the just created rcp entries to be indexed before searching them.
+        growth_search_results = search_lab_ids(
+            archive,
+            {
+                'results.eln.sections:any': ['GrowthMovpeIKZ'],
+                'upload_id:any': [archive.m_context.upload_id],
+            },
+            parameter_sheet['Sample ID'].dropna(),
+            logger,
+        )
+
+        # search the existing experiment archives once and index them by lab_id
+        search_experiments = search(
+            owner='user',
+            query={
+                'results.eln.sections:any': ['ExperimentMovpeIKZ'],
+                #'results.eln.methods:any': ['MOVPE 1 experiment'],
+                'upload_id:any': [archive.m_context.upload_id],
+            },
+            pagination=MetadataPagination(page_size=10000),
+            user_id=archive.metadata.main_author.user_id,
+        )
+        experiments_by_lab_id = index_by_lab_id(search_experiments.data)
+
         for index, sample_id in enumerate(parameter_sheet['Sample ID']):
-            # find a growth run archive parsed by the rcp parser.
-            # The recognition is based on the folder name where the rcp file was contained in
-            time.sleep(
-                0.6
-            )  # allow the just created rcp entry to be indexing before searching for it
             if pd.isna(sample_id):
                 continue
-            search_growth = search(
-                owner='all',
-                query={
-                    'results.eln.sections:any': ['GrowthMovpeIKZ'],
-                    'upload_id:any': [archive.m_context.upload_id],
-                    'results.eln.lab_ids:any': [sample_id],
-                },
-                pagination=MetadataPagination(page_size=10000),
-                user_id=archive.metadata.main_author.user_id,
-            )
-            if search_growth.pagination.total > 1:
+            search_growth = growth_search_results.get(str(sample_id), [])
+            if len(search_growth) > 1:
                 logger.warn(
-                    f'{search_growth.pagination.total} growth runs with lab_id {sample_id} found. Please check the upload with upload id {archive.m_context.upload_id}.'
+                    f'{len(search_growth)} growth runs with lab_id {sample_id} found. Please check the upload with upload id {archive.m_context.upload_id}.'
                 )
                 continue
-            if search_growth.pagination.total == 0:
+            if len(search_growth) == 0:
                 logger.warn(
-                    f'{search_growth.pagination.total} growth runs with lab_id {sample_id} found. Please upload a recipe file for this sample.'
+                    f'{len(search_growth)} growth runs with lab_id {sample_id} found. Please upload a recipe file for this sample.'
                 )
                 continue
-            if search_growth.pagination.total == 1:
+            if len(search_growth) == 1:
                 with archive.m_context.raw_file(
-                    search_growth.data[0]['mainfile'], 'r'
+                    search_growth[0]['mainfile'], 'r'
                 ) as file:
-                    dict_from_rcp = yaml.safe_load(file)
+                    dict_from_rcp = deserialize_archive(
+                        file.read(), archive_file_type(search_growth[0]['mainfile'])
+                    )
                     if 'data' in dict_from_rcp:
                         growth_from_rcp = GrowthMovpeIKZ.m_from_dict(
                             dict_from_rcp['data']
@@ -222,17 +246,6 @@ class ParserMovpe1IKZ(MatchingParser):
                         )
                         continue
 
-            # check if experiment archive exists already
-            search_experiments = search(
-                owner='user',
-                query={
-                    'results.eln.sections:any': ['ExperimentMovpeIKZ'],
-                    #'results.eln.methods:any': ['MOVPE 1 experiment'],
-                    'upload_id:any': [archive.m_context.upload_id],
-                },
-                pagination=MetadataPagination(page_size=10000),
-                user_id=archive.metadata.main_author.user_id,
-            )
             # check if experiment entries are already indexed
             matches = {
                 'lab_id': [],
@@ -241,12 +254,11 @@ class ParserMovpe1IKZ(MatchingParser):
                 'upload_id': [],
             }
             if search_experiments.pagination.total >= 1:
-                for match in search_experiments.data:
-                    if f'{sample_id} experiment' in match['results']['eln']['lab_ids']:
-                        matches['lab_id'].extend(match['results']['eln']['lab_ids'])
-                        matches['entry_id'].append(match['entry_id'])
-                        matches['entry_name'].append(match['entry_name'])
-                        matches['upload_id'].append(match['upload_id'])
+                for match in experiments_by_lab_id.get(f'{sample_id} experiment', []):
+                    matches['lab_id'].extend(match['results']['eln']['lab_ids'])
+                    matches['entry_id'].append(match['entry_id'])
+                    matches['entry_name'].append(match['entry_name'])
+                    matches['upload_id'].append(match['upload_id'])
                 if len(matches['entry_id']) == 1:
                     logger.warning(
                         f'One entry with lab_id {set(matches["lab_id"])} and entry_id {set(matches["entry_id"])} already exists. '
@@ -562,8 +574,8 @@ class ParserMovpe1IKZ(MatchingParser):
                 create_archive(
                     growth_archive.m_to_dict(),
                     archive.m_context,
-                    search_growth.data[0]['mainfile'],
-                    filetype,
+                    search_growth[0]['mainfile'],
+                    archive_file_type(search_growth[0]['mainfile']),
                     logger,
                     overwrite=True,
                 )
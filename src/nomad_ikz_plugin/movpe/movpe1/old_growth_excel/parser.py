@@ -17,6 +17,7 @@
 #
 
 import pandas as pd
+from nomad.config import config
 from nomad.datamodel.data import (
     EntryData,
 )
@@ -77,9 +78,16 @@ from nomad_ikz_plugin.utils import (
     clean_dataframe_headers,
     create_archive,
     get_hash_ref,
+    index_by_lab_id,
+    open_excel,
+    read_excel_sheet,
     row_timeseries,
 )
 
+configuration = config.get_plugin_entry_point(
+    'nomad_ikz_plugin.movpe.movpe1.old_growth_excel:parser'
+)
+
 
 class RawFileMovpeDepositionControl(EntryData):
     m_def = Section(
@@ -105,15 +113,15 @@ class ParserMovpe1IKZ(MatchingParser):
     def parse(self, mainfile: str, archive: EntryArchive, logger) -> None:
         from nomad.search import MetadataPagination, search
 
-        filetype = 'yaml'
-        xlsx = pd.ExcelFile(mainfile)
+        filetype = configuration.archive_format
+        xlsx = open_excel(mainfile)
         data_file = mainfile.split('/')[-1]
         data_file_with_path = mainfile.split('raw/')[-1]
         # Read the file without headers
-        dep_control = pd.read_excel(
+        dep_control = read_excel_sheet(
             xlsx, 'Deposition Control', comment='#', header=None
         )
-        precursors = pd.read_excel(xlsx, 'Precursors', comment='#', header=None)
+        precursors = read_excel_sheet(xlsx, 'Precursors', comment='#', header=None)
 
         dep_control = clean_dataframe_headers(dep_control)
 
@@ -129,6 +137,19 @@ class ParserMovpe1IKZ(MatchingParser):
                 f'Please check the file and try again.'
             )
 
+        # search the existing experiment archives once and index them by lab_id
+        search_experiments = search(
+            owner='user',
+            query={
+                'results.eln.sections:any': ['ExperimentMovpeIKZ'],
+                'results.eln.methods:any': ['MOVPE 1 experiment'],
+                'upload_id:any': [archive.m_context.upload_id],
+            },
+            pagination=MetadataPagination(page_size=10000),
+            user_id=archive.metadata.main_author.user_id,
+        )
+        experiments_by_lab_id = index_by_lab_id(search_experiments.data)
+
         for index, dep_control_run in enumerate(dep_control['Sample ID']):
             assert dep_control_run == precursors['Sample ID'].loc[index], (
                 f'Not matching Sample ID at line {index} in '
@@ -137,17 +158,6 @@ class ParserMovpe1IKZ(MatchingParser):
                 f'Please check the files and try again.'
             )
 
-            # check if experiment archive exists already
-            search_experiments = search(
-                owner='user',
-                query={
-                    'results.eln.sections:any': ['ExperimentMovpeIKZ'],
-                    'results.eln.methods:any': ['MOVPE 1 experiment'],
-                    'upload_id:any': [archive.m_context.upload_id],
-                },
-                pagination=MetadataPagination(page_size=10000),
-                user_id=archive.metadata.main_author.user_id,
-            )
             # check if experiment entries are already indexed
             matches = {
                 'lab_id': [],
@@ -156,15 +166,13 @@ class ParserMovpe1IKZ(MatchingParser):
                 'upload_id': [],
             }
             if search_experiments.pagination.total >= 1:
-                for match in search_experiments.data:
-                    if (
-                        f'{dep_control_run} experiment'
-                        in match['results']['eln']['lab_ids']
-                    ):
-                        matches['lab_id'].extend(match['results']['eln']['lab_ids'])
-                        matches['entry_id'].append(match['entry_id'])
-                        matches['entry_name'].append(match['entry_name'])
-                        matches['upload_id'].append(match['upload_id'])
+                for match in experiments_by_lab_id.get(
+                    f'{dep_control_run} experiment', []
+                ):
+                    matches['lab_id'].extend(match['results']['eln']['lab_ids'])
+                    matches['entry_id'].append(match['entry_id'])
+                    matches['entry_name'].append(match['entry_name'])
+                    matches['upload_id'].append(match['upload_id'])
                 if len(matches['entry_id']) == 1:
                     logger.warning(
                         f'One entry with lab_id {set(matches["lab_id"])} and entry_id {set(matches["entry_id"])} already exists. '
@@ -16,6 +16,8 @@
 # limitations under the License.
 #
 
+import numpy as np
+from nomad.config import config
 from nomad.datamodel.data import (
     EntryData,
 )
@@ -57,6 +59,112 @@ from nomad_ikz_plugin.utils import (
     create_archive,
 )
 
+configuration = config.get_plugin_entry_point(
+    'nomad_ikz_plugin.movpe.movpe1.rcp:parser'
+)
+
+RCP_CHANNELS = {
+    # channel id: (path of the section in the step, quantity, section class, unit)
+    '3': (
+        ('environment',),
+        'uniform_gas_flow_rate',
+        VolumetricFlowRate,
+        'cm**3/minute',
+    ),
+    # O2 GasLineSource
+    '6': (
+        ('sources', 0, 'vapor_source'),
+        'total_flow_rate',
+        VolumetricFlowRate,
+        'cm**3/minute',
+    ),
+    # flash evap no. 1
+    '9': (
+        ('sources', 1, 'vapor_source'),
+        'carrier_push_flow_rate',
+        VolumetricFlowRate,
+        'cm**3/minute',
+    ),
+    '12': (
+        ('sources', 1, 'vapor_source'),
+        'carrier_purge_flow_rate',
+        VolumetricFlowRate,
+        'cm**3/minute',
+    ),
+    # flash evap no. 2
+    '28': (
+        ('sources', 2, 'vapor_source'),
+        'carrier_push_flow_rate',
+        VolumetricFlowRate,
+        'cm**3/minute',
+    ),
+    '31': (
+        ('sources', 2, 'vapor_source'),
+        'carrier_purge_flow_rate',
+        VolumetricFlowRate,
+        'cm**3/minute',
+    ),
+    # peristaltic pump no. 1: Ti
+    '34': (('sources', 1), 'peristaltic_pump_flux', VolumetricFlowRate, 'cm**3/minute'),
+    # peristaltic pump no. 2: Ca - Sr - Ba
+    '36': (('sources', 2), 'peristaltic_pump_flux', VolumetricFlowRate, 'cm**3/minute'),
+    '17': (
+        ('sample_parameters', 0),
+        'filament_temperature',
+        FilamentTemperature,
+        'celsius',
+    ),
+    '19': (('sample_parameters', 0), 'shaft_temperature', ShaftTemperature, 'celsius'),
+    '21': (('environment',), 'rotation', Rotation, 'rpm'),
+    # FE1 temperature
+    '15': (('sources', 1, 'vapor_source'), 'temperature', Temperature, 'celsius'),
+    # FE2 temperature
+    '26': (('sources', 2, 'vapor_source'), 'temperature', Temperature, 'celsius'),
+    # chamber pressure
+    '23': (('environment',), 'pressure', Pressure, 'mbar'),
+}
+
+
+def read_rcp_channels(lines: list[str], total_steps: int) -> tuple[list, np.ndarray]:
+    """
+    Reads the set values of the channels of a recipe that are listed in
+    `RCP_CHANNELS`. Each channel is stored in four lines: the header starting with the
+    channel id, the set values of the steps multiplied by 10, the ramps and the states
+    (0=ON, 1=OFF, 2=VENT). Reading stops at the first incomplete channel. The set
+    values of the steps missing in a channel are NaN.
+
+    Args:
+        lines (list[str]): The lines of the recipe file following the step durations.
+        total_steps (int): The number of steps of the recipe.
+
+    Returns:
+        tuple[list, np.ndarray]: The ids of the channels and their set values as a
+        (channels x steps) matrix.
+    """
+    channel_ids = []
+    rows = []
+    for index in range(0, len(lines) - 3, 4):
+        header, value, ramp, state = (line.split() for line in lines[index : index + 4])
+        if not header or not value or not ramp or not state:
+            break
+        if header[0] in RCP_CHANNELS:
+            channel_ids.append(header[0])
+            rows.append(np.array(value[:total_steps], dtype=float))
+    values = np.full((len(rows), total_steps), np.nan)
+    for channel_values, row in zip(values, rows):
+        channel_values[: len(row)] = row
+    return channel_ids, values / 10
+
+
+def step_section(step, path):
+    """
+    Returns the section of a recipe step at the path of `RCP_CHANNELS`.
+    """
+    section = step
+    for key in path:
+        section = section[key] if isinstance(key, int) else getattr(section, key)
+    return section
+
 
 class RcpFileMovpe1(EntryData):
     m_def = Section(
@@ -77,7 +185,7 @@ class RcpFileMovpe1(EntryData):
 
 class ParserMovpe1RcpIKZ(MatchingParser):
     def parse(self, mainfile: str, archive: EntryArchive, logger) -> None:
-        filetype = 'yaml'
+        filetype = configuration.archive_format
 
         # check the correctness of the file location in the uploaded zip folder
         assert mainfile.split('/')[-2] == 'Software file', (
@@ -95,308 +203,68 @@ class ParserMovpe1RcpIKZ(MatchingParser):
         )
 
         with open(mainfile, encoding='utf-8') as file:
-            total_steps = file.readline().split()[0]
-            duration = file.readline().split()
-            set_recipe_time = [0]
-            file.readline()
-            for step in range(int(total_steps)):
-                set_recipe_time.append(set_recipe_time[step] + int(duration[step]))
-                process_step_data = GrowthStepMovpeIKZ(
-                    sources=[
-                        GasLineSource(
-                            name='Oxygen',
-                            vapor_source=GasLineEvaporator(
-                                total_flow_rate=VolumetricFlowRate(),
-                            ),
+            lines = file.read().splitlines()
+        total_steps = int(lines[0].split()[0])
+        duration = [int(step_duration) for step_duration in lines[1].split()]
+        set_recipe_time = [0]
+        for step in range(total_steps):
+            set_recipe_time.append(set_recipe_time[step] + duration[step])
+            process_step_data = GrowthStepMovpeIKZ(
+                sources=[
+                    GasLineSource(
+                        name='Oxygen',
+                        vapor_source=GasLineEvaporator(
+                            total_flow_rate=VolumetricFlowRate(),
                         ),
-                        FlashSource(
-                            name='Flash Evap. 1',
-                            vapor_source=FlashEvaporatorIKZ(
-                                carrier_gas=PureSubstanceSection(
-                                    name='Argon',
-                                ),
-                                carrier_push_flow_rate=VolumetricFlowRate(),
-                                carrier_purge_flow_rate=VolumetricFlowRate(),
+                    ),
+                    FlashSource(
+                        name='Flash Evap. 1',
+                        vapor_source=FlashEvaporatorIKZ(
+                            carrier_gas=PureSubstanceSection(
+                                name='Argon',
                             ),
+                            carrier_push_flow_rate=VolumetricFlowRate(),
+                            carrier_purge_flow_rate=VolumetricFlowRate(),
                         ),
-                        FlashSource(
-                            name='Flash Evap. 2',
-                            vapor_source=FlashEvaporatorIKZ(
-                                carrier_gas=PureSubstanceSection(
-                                    name='Argon',
-                                ),
-                                carrier_push_flow_rate=VolumetricFlowRate(),
-                                carrier_purge_flow_rate=VolumetricFlowRate(),
+                    ),
+                    FlashSource(
+                        name='Flash Evap. 2',
+                        vapor_source=FlashEvaporatorIKZ(
+                            carrier_gas=PureSubstanceSection(
+                                name='Argon',
                             ),
+                            carrier_push_flow_rate=VolumetricFlowRate(),
+                            carrier_purge_flow_rate=VolumetricFlowRate(),
                         ),
-                    ],
-                    environment=ChamberEnvironmentMovpe(),
-                    sample_parameters=[SampleParametersMovpe()],
-                    duration=int(duration[step]),
-                    step_index=step + 1,
-                )
-                process_data.m_add_sub_section(GrowthMovpeIKZ.steps, process_step_data)
-
-            line = file.readline()
-            while line != '':
-                header = (
-                    line.split()
-                )  # a new line it is read at the bottom of the loop!
-                value = [float(element) / 10 for element in file.readline().split()]
-                ramp = file.readline().split()  # not used
-                state = file.readline().split()  # 0=ON, 1=OFF, 2=VENT
-                if not header or not value or not ramp or not state:
-                    break
-                if header[0] == '3':
-                    for step in range(int(total_steps)):
-                        process_data.steps[
-                            step
-                        ].environment.uniform_gas_flow_rate = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '6':  # O2 GasLineSource
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            0
-                        ].vapor_source.total_flow_rate = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '9':  # flash evap no. 1
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            1
-                        ].vapor_source.carrier_push_flow_rate = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '12':  # flash evap no. 1
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            1
-                        ].vapor_source.carrier_purge_flow_rate = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '28':  # flash evap no. 2
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            2
-                        ].vapor_source.carrier_push_flow_rate = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '31':  # flash evap no. 2
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            2
-                        ].vapor_source.carrier_purge_flow_rate = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '36':  # peristaltic pump no. 2: Ca - Sr - Ba
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            2
-                        ].peristaltic_pump_flux = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '34':  # peristaltic pump no. 1: Ti
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            1
-                        ].peristaltic_pump_flux = VolumetricFlowRate(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('centimeter ** 3 / minute'),
-                                )
-                            ],
-                        )
-                elif header[0] == '17':  # filament temperature
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sample_parameters[
-                            0
-                        ].filament_temperature = FilamentTemperature(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('celsius'),
-                                )
-                            ],
-                        )
-                elif header[0] == '19':  # shaft temperature
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sample_parameters[
-                            0
-                        ].shaft_temperature = ShaftTemperature(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('celsius'),
-                                )
-                            ],
-                        )
-                elif header[0] == '21':  # rotation
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].environment.rotation = Rotation(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('rpm'),
-                                )
-                            ],
-                        )
-                elif header[0] == '15':  # FE1 temperature
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            1
-                        ].vapor_source.temperature = Temperature(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('celsius'),
-                                )
-                            ],
-                        )
-                elif header[0] == '26':  # FE2 temperature
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].sources[
-                            2
-                        ].vapor_source.temperature = Temperature(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('celsius'),
-                                )
-                            ],
-                        )
-                elif header[0] == '23':  # chamber pressure
-                    for step in range(int(total_steps)):
-                        process_data.steps[step].environment.pressure = Pressure(
-                            set_time=[
-                                ureg.Quantity(
-                                    set_recipe_time[step],
-                                    ureg.second,
-                                )
-                            ],
-                            set_value=[
-                                ureg.Quantity(
-                                    float(value[step]),
-                                    ureg('mbar'),
-                                )
-                            ],
-                        )
+                    ),
+                ],
+                environment=ChamberEnvironmentMovpe(),
+                sample_parameters=[SampleParametersMovpe()],
+                duration=int(duration[step]),
+                step_index=step + 1,
+            )
+            process_data.m_add_sub_section(GrowthMovpeIKZ.steps, process_step_data)
 
-                line = file.readline()
+        # the set values of each channel are converted at once and set in each step
+        channel_ids, values = read_rcp_channels(lines[3:], total_steps)
+        for channel_id, channel_values in zip(channel_ids, values):
+            path, quantity, section_class, unit = RCP_CHANNELS[channel_id]
+            set_values = (
+                ureg.Quantity(channel_values, unit)
+                .to(section_class.set_value.unit)
+                .magnitude
+            )
+            for step in range(total_steps):
+                if np.isnan(set_values[step]):
+                    continue
+                setattr(
+                    step_section(process_data.steps[step], path),
+                    quantity,
+                    section_class(
+                        set_time=[set_recipe_time[step]],
+                        set_value=[set_values[step]],
+                    ),
+                )
 
         process_filename = f'{mainfile.split("/")[-1][:-4]}.archive.{filetype}'
         process_archive = EntryArchive(
@@ -18,9 +18,15 @@
 
 import pandas as pd
 
+from nomad_ikz_plugin.utils import ColumnGroups
+
 
 def create_timeseries_objects(
-    dataframe: pd.DataFrame, quantities, MetainfoClass, index
+    dataframe: pd.DataFrame,
+    quantities,
+    MetainfoClass,
+    index,
+    column_groups: ColumnGroups = None,
 ):
     """_summary_
 
@@ -29,28 +35,15 @@ def create_timeseries_objects(
         quantities (_type_): _description_
         MetainfoClass (_type_): _description_
         index (_type_): _description_
+        column_groups (ColumnGroups, optional): The repeated columns of the dataframe,
+            to reuse them for all rows.
 
     Returns:
         _type_: _description_
     """
-    objects = []
-    i = 0
-    while True:
-        if all(
-            f'{key}{"" if i == 0 else "." + str(i)}' in dataframe.columns
-            for key in quantities
-        ):
-            objects.append(
-                MetainfoClass(
-                    time=dataframe.get(
-                        f'{quantities[0]}{"" if i == 0 else "." + str(i)}', ''
-                    )[index],
-                    value=dataframe.get(
-                        f'{quantities[1]}{"" if i == 0 else "." + str(i)}', 0
-                    )[index],
-                )
-            )
-            i += 1
-        else:
-            break
-    return objects
+    if column_groups is None:
+        column_groups = ColumnGroups(dataframe)
+    return [
+        MetainfoClass(time=values[0], value=values[1])
+        for values in column_groups.values(index, quantities)
+    ]
@@ -16,9 +16,8 @@
 # limitations under the License.
 #
 
-from time import sleep
-
 import pandas as pd
+from nomad.config import config
 from nomad.datamodel.data import (
     EntryData,
 )
@@ -62,12 +61,23 @@ from nomad_ikz_plugin.movpe.schema import (
     ThinFilmStackMovpe,
     ThinFilmStackMovpeReference,
 )
-from nomad_ikz_plugin.utils import create_archive
+from nomad_ikz_plugin.utils import (
+    ColumnGroups,
+    create_archive,
+    open_excel,
+    read_excel_sheet,
+    wait_for_entries,
+)
 
 from ..utils import (
     fetch_substrate,
     populate_gas_source,
     populate_sources,
+    search_substrates,
+)
+
+configuration = config.get_plugin_entry_point(
+    'nomad_ikz_plugin.movpe.movpe2.growth_excel:parser'
 )
 
 
@@ -94,9 +104,9 @@ class ParserMovpe2IKZ(MatchingParser):
         Parses the MOVPE 2 IKZ raw file and creates the corresponding archives.
         """
 
-        filetype = 'yaml'
+        filetype = configuration.archive_format
         data_file = mainfile.split('/')[-1]
-        growth_run_file = pd.read_excel(mainfile, comment='#')
+        growth_run_file = read_excel_sheet(open_excel(mainfile), comment='#')
         recipe_ids = list(
             set(
                 growth_run_file['Recipe Name']
@@ -105,6 +115,15 @@ class ParserMovpe2IKZ(MatchingParser):
             )
         )
 
+        # resolving all substrates with a single search
+        substrate_search_results = search_substrates(
+            archive,
+            growth_run_file['Substrate Name'].dropna()
+            if 'Substrate Name' in growth_run_file.columns
+            else [],
+        )
+        substrate_upload_cache = {}
+
         # initializing experiments dict
         growth_processes: dict[str, GrowthMovpeIKZ] = {}
         # initializing steps dict
@@ -112,6 +131,7 @@ class ParserMovpe2IKZ(MatchingParser):
         # initializing samples dict
         samples_lists: dict[str, dict[str, list]] = {}
 
+        column_groups = ColumnGroups(growth_run_file)
         for index, sample_id in enumerate(growth_run_file['Sample Name']):
             recipe_id = (
                 growth_run_file['Recipe Name'][index]
@@ -155,7 +175,14 @@ class ParserMovpe2IKZ(MatchingParser):
                     )
                 ],
             )
-            substrate_ref = fetch_substrate(archive, sample_id, substrate_id, logger)
+            substrate_ref = fetch_substrate(
+                archive,
+                sample_id,
+                substrate_id,
+                logger,
+                search_results=substrate_search_results,
+                upload_cache=substrate_upload_cache,
+            )
             if substrate_ref is not None:
                 grown_sample_data.substrate = SubstrateReference(
                     reference=substrate_ref
@@ -269,8 +296,8 @@ class ParserMovpe2IKZ(MatchingParser):
                     if 'Comments' in growth_run_file.columns
                     else None
                 ),
-                sources=populate_sources(index, growth_run_file)
-                + populate_gas_source(index, growth_run_file),
+                sources=populate_sources(index, growth_run_file, column_groups)
+                + populate_gas_source(index, growth_run_file, column_groups),
                 environment=ChamberEnvironmentMovpe(
                     pressure=Pressure(
                         set_value=pd.Series(
@@ -393,7 +420,18 @@ class ParserMovpe2IKZ(MatchingParser):
 
         experiment_reference = []
 
-        sleep(2)  # to give GrowthProcessIKZ the time to be indexed
+        # give the GrowthMovpeIKZ entries the time to be indexed
+        wait_for_entries(
+            archive,
+            [
+                hash(
+                    archive.m_context.upload_id,
+                    f'{recipe_id}.GrowthMovpeIKZ.archive.{filetype}',
+                )
+                for recipe_id in growth_processes
+            ],
+            logger,
+        )
 
         for recipe_id in recipe_ids:
             experiment_filename = f'{recipe_id}.ExperimentMovpeIKZ.archive.{filetype}'
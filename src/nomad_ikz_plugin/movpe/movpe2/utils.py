@@ -16,11 +16,9 @@
 # limitations under the License.
 #
 
-import json
 import math
 
 import pandas as pd
-import yaml
 from nomad.datamodel.context import ClientContext, ServerContext
 from nomad.datamodel.metainfo.basesections import (
     PureSubstanceComponent,
@@ -43,6 +41,12 @@ from nomad_material_processing.vapor_deposition.general import (
     VolumetricFlowRate,
 )
 
+from nomad_ikz_plugin.utils import (
+    ColumnGroups,
+    archive_content_equal,
+    serialize_archive,
+)
+
 
 def get_reference(upload_id, entry_id):
     return f'../uploads/{upload_id}/archive/{entry_id}'
@@ -97,27 +101,20 @@ def create_archive(
 ):
     if isinstance(context, ClientContext):
         return None
-    if context.raw_path_exists(filename):
-        with context.raw_file(filename, 'r') as file:
-            existing_dict = yaml.safe_load(file)
-    if context.raw_path_exists(filename) and not dict_nan_equal(
-        existing_dict, entry_dict
-    ):
+    content = serialize_archive(entry_dict, file_type)
+    file_exists = context.raw_path_exists(filename)
+    contents_are_equal = file_exists and archive_content_equal(
+        context, filename, content, file_type
+    )
+    if file_exists and not contents_are_equal:
         logger.error(
             f'{filename} archive file already exists. '
             f'You are trying to overwrite it with a different content. '
             f'To do so, remove the existing archive and click reprocess again.'
         )
-    if (
-        not context.raw_path_exists(filename)
-        or existing_dict == entry_dict
-        or overwrite
-    ):
+    if not file_exists or contents_are_equal or overwrite:
         with context.raw_file(filename, 'w') as newfile:
-            if file_type == 'json':
-                json.dump(entry_dict, newfile)
-            elif file_type == 'yaml':
-                yaml.dump(entry_dict, newfile)
+            newfile.write(content)
         context.upload.process_updated_raw_file(filename, allow_modify=True)
 
     return get_reference(
@@ -157,62 +154,119 @@ def create_archive(
 #         )
 
 
-def fetch_substrate(archive, sample_id, substrate_id, logger):
-    from nomad.search import search
+def search_substrates(archive, substrate_ids):
+    """
+    Search all substrate entries with one of the given lab_ids in a single query.
+    The results are paged through with `search_iterator`. Nothing is searched for a
+    `ClientContext`.
 
-    substrate_reference_str = None
-    search_result = search(
+    Returns:
+        dict[str, list[dict]]: The search results grouped by lab_id.
+    """
+    from nomad.app.v1.models.models import MetadataRequired
+    from nomad.search import search_iterator
+
+    substrate_ids = sorted({str(substrate_id) for substrate_id in substrate_ids})
+    search_results = {substrate_id: [] for substrate_id in substrate_ids}
+    if not substrate_ids or isinstance(archive.m_context, ClientContext):
+        return search_results
+    for entry in search_iterator(
         owner='all',
         query={
             'results.eln.sections:any': ['SubstrateMovpe', 'Substrate'],
-            'results.eln.lab_ids:any': [substrate_id],
+            'results.eln.lab_ids:any': substrate_ids,
         },
+        required=MetadataRequired(
+            include=['entry_id', 'upload_id', 'results.eln.lab_ids']
+        ),
         user_id=archive.metadata.main_author.user_id,
+    ):
+        lab_ids = entry.get('results', {}).get('eln', {}).get('lab_ids', [])
+        for lab_id in set(lab_ids):
+            if lab_id in search_results:
+                search_results[lab_id].append(entry)
+    return search_results
+
+
+def substrate_upload_is_available(archive, upload_id, upload_cache=None):
+    """
+    Check if the raw files of the upload containing a substrate can be accessed.
+    The result is stored in `upload_cache` by upload_id, so the upload files and the
+    context are only created once per upload.
+    """
+    if upload_cache is not None and upload_id in upload_cache:
+        return upload_cache[upload_id]
+    from nomad.app.v1.models.models import User
+    from nomad.app.v1.routers.uploads import get_upload_with_read_access
+    from nomad.files import UploadFiles
+
+    upload_files = UploadFiles.get(upload_id)
+
+    substrate_context = ServerContext(
+        get_upload_with_read_access(
+            upload_id,
+            User(
+                is_admin=True,
+                user_id=archive.metadata.main_author.user_id,
+            ),
+            include_others=True,
+        )
     )
-    if not search_result.data:
+    is_available = upload_files.raw_path_is_file(substrate_context.raw_path())
+    if upload_cache is not None:
+        upload_cache[upload_id] = is_available
+    return is_available
+
+
+def fetch_substrate(
+    archive,
+    sample_id,
+    substrate_id,
+    logger,
+    *,
+    search_results=None,
+    upload_cache=None,
+):
+    """
+    Fetch the reference to the substrate entry with the lab_id `substrate_id`.
+    If the `search_results` of `search_substrates` are given, the substrate is looked
+    up in them instead of searching for it.
+    """
+    if search_results is None:
+        search_results = search_substrates(archive, [substrate_id])
+    hits = search_results.get(str(substrate_id), [])
+    if not hits:
         logger.warn(
             f'Substrate entry [{substrate_id}] was not found, upload and reprocess to reference it in ThinFilmStack entry [{sample_id}]'
         )
         return None
-    if len(search_result.data) > 1:
+    if len(hits) > 1:
         logger.warn(
-            f'Found {search_result.pagination.total} entries with lab_id: '
+            f'Found {len(hits)} entries with lab_id: '
             f'"{substrate_id}". Will use the first one found.'
         )
         return None
-    if len(search_result.data) >= 1:
-        upload_id = search_result.data[0]['upload_id']
-        from nomad.app.v1.models.models import User
-        from nomad.app.v1.routers.uploads import get_upload_with_read_access
-        from nomad.files import UploadFiles
-
-        upload_files = UploadFiles.get(upload_id)
-
-        substrate_context = ServerContext(
-            get_upload_with_read_access(
-                upload_id,
-                User(
-                    is_admin=True,
-                    user_id=archive.metadata.main_author.user_id,
-                ),
-                include_others=True,
-            )
-        )
-
-        if upload_files.raw_path_is_file(substrate_context.raw_path()):
-            substrate_reference_str = f'../uploads/{search_result.data[0]["upload_id"]}/archive/{search_result.data[0]["entry_id"]}#data'
-            return substrate_reference_str
-        else:
-            logger.warn(
-                f"The path '../uploads/{search_result.data[0]['upload_id']}/archive/{search_result.data[0]['entry_id']}#data' is not a file, upload and reprocess to reference it in ThinFilmStack entry [{sample_id}]"
-            )
-            return None
+    upload_id = hits[0]['upload_id']
+    substrate_reference_str = (
+        f'../uploads/{upload_id}/archive/{hits[0]["entry_id"]}#data'
+    )
+    if substrate_upload_is_available(archive, upload_id, upload_cache):
+        return substrate_reference_str
+    logger.warn(
+        f"The path '{substrate_reference_str}' is not a file, upload and reprocess to reference it in ThinFilmStack entry [{sample_id}]"
+    )
+    return None
 
 
-def populate_sources(line_number, growth_run_file: pd.DataFrame):
+def populate_sources(
+    line_number, growth_run_file: pd.DataFrame, column_groups: ColumnGroups = None
+):
     """
-    Populate the Bubbler object from the growth run file
+    Populate the Bubbler object from the growth run file.
+    Pass the `column_groups` of the growth run file to reuse them for all lines.
     """
+    if column_groups is None:
+        column_groups = ColumnGroups(growth_run_file)
     sources = []
     bubbler_quantities = [
         'Bubbler Temp',
@@ -225,164 +279,91 @@ def populate_sources(line_number, growth_run_file: pd.DataFrame):
         'Bubbler Molar Flux',
         'Bubbler Material',
     ]
-    i = 0
-    while True:
-        if all(
-            f'{key}{"" if i == 0 else "." + str(i)}' in growth_run_file.columns
-            for key in bubbler_quantities
-        ):
-            sources.append(
-                BubblerSource(
-                    name=growth_run_file.get(
-                        f'Bubbler Material{"" if i == 0 else "." + str(i)}', ''
-                    )[line_number],
-                    material=[
-                        PureSubstanceComponent(
-                            substance_name=growth_run_file.get(
-                                f'Bubbler Material{"" if i == 0 else "." + str(i)}', ''
-                            )[line_number],
-                            pure_substance=PureSubstanceSection(
-                                name=growth_run_file.get(
-                                    f'Bubbler Material{"" if i == 0 else "." + str(i)}',
-                                    '',
-                                )[line_number]
-                            ),
-                        ),
-                    ],
-                    vapor_source=BubblerEvaporator(
-                        temperature=Temperature(
-                            set_value=pd.Series(
-                                [
-                                    growth_run_file.get(
-                                        f'Bubbler Temp{"" if i == 0 else "." + str(i)}',
-                                        0,
-                                    )[line_number]
-                                ]
-                            )
-                            * ureg('celsius').to('kelvin').magnitude,
-                        ),
-                        pressure=Pressure(
-                            set_value=pd.Series(
-                                [
-                                    growth_run_file.get(
-                                        f'Bubbler Pressure{"" if i == 0 else "." + str(i)}',
-                                        0,
-                                    )[line_number]
-                                ]
-                            )
-                            * ureg('mbar').to('pascal').magnitude,
-                        ),
-                        precursor_partial_pressure=PartialVaporPressure(
-                            set_value=pd.Series(
-                                [
-                                    growth_run_file.get(
-                                        f'Bubbler Partial Pressure{"" if i == 0 else "." + str(i)}',
-                                        0,
-                                    )[line_number]
-                                ]
-                            ),
-                        ),
-                        total_flow_rate=VolumetricFlowRate(
-                            set_value=pd.Series(
-                                [
-                                    growth_run_file.get(
-                                        f'Bubbler MFC{"" if i == 0 else "." + str(i)}',
-                                        0,
-                                    )[line_number]
-                                ]
-                            )
-                            * ureg('cm **3 / minute')
-                            .to('meter ** 3 / second')
-                            .magnitude,
-                        ),
-                        dilution=growth_run_file.get(
-                            f'Bubbler Dilution{"" if i == 0 else "." + str(i)}', 0
-                        )[line_number],
-                        source=growth_run_file.get(
-                            f'Source{"" if i == 0 else "." + str(i)}', 0
-                        )[line_number],
-                        inject=growth_run_file.get(
-                            f'Inject{"" if i == 0 else "." + str(i)}', 0
-                        )[line_number],
+    for (
+        temperature,
+        pressure,
+        partial_pressure,
+        dilution,
+        source,
+        inject,
+        mfc,
+        molar_flux,
+        material,
+    ) in column_groups.values(line_number, bubbler_quantities):
+        sources.append(
+            BubblerSource(
+                name=material,
+                material=[
+                    PureSubstanceComponent(
+                        substance_name=material,
+                        pure_substance=PureSubstanceSection(name=material),
+                    ),
+                ],
+                vapor_source=BubblerEvaporator(
+                    temperature=Temperature(
+                        set_value=pd.Series([temperature])
+                        * ureg('celsius').to('kelvin').magnitude,
+                    ),
+                    pressure=Pressure(
+                        set_value=pd.Series([pressure])
+                        * ureg('mbar').to('pascal').magnitude,
+                    ),
+                    precursor_partial_pressure=PartialVaporPressure(
+                        set_value=pd.Series([partial_pressure]),
                     ),
-                    vapor_molar_flow_rate=MolarFlowRate(
-                        set_value=pd.Series(
-                            [
-                                growth_run_file.get(
-                                    f'Bubbler Molar Flux{"" if i == 0 else "." + str(i)}',
-                                    0,
-                                )[line_number]
-                            ]
-                        )
-                        * ureg('mol / minute').to('mol / second').magnitude,
+                    total_flow_rate=VolumetricFlowRate(
+                        set_value=pd.Series([mfc])
+                        * ureg('cm **3 / minute').to('meter ** 3 / second').magnitude,
                     ),
+                    dilution=dilution,
+                    source=source,
+                    inject=inject,
                 ),
-            )
-
-            i += 1
-        else:
-            break
+                vapor_molar_flow_rate=MolarFlowRate(
+                    set_value=pd.Series([molar_flux])
+                    * ureg('mol / minute').to('mol / second').magnitude,
+                ),
+            ),
+        )
     return sources
 
 
-def populate_gas_source(line_number, growth_run_file: pd.DataFrame):
+def populate_gas_source(
+    line_number, growth_run_file: pd.DataFrame, column_groups: ColumnGroups = None
+):
     """
-    Populate the GasSource object from the growth run file
+    Populate the GasSource object from the growth run file.
+    Pass the `column_groups` of the growth run file to reuse them for all lines.
     """
+    if column_groups is None:
+        column_groups = ColumnGroups(growth_run_file)
     gas_sources = []
     gas_source_quantities = [
         'Gas Material',
         'Gas MFC',
         'Gas Molar Flux',
     ]
-    i = 0
-    while True:
-        if all(
-            f'{key}{"" if i == 0 else "." + str(i)}' in growth_run_file.columns
-            for key in gas_source_quantities
-        ):
-            gas_sources.append(
-                GasLineSource(
-                    name=growth_run_file.get(
-                        f'Gas Material{"" if i == 0 else "." + str(i)}', ''
-                    )[line_number],
-                    material=[
-                        PureSubstanceComponent(
-                            substance_name=growth_run_file.get(
-                                f'Gas Material{"" if i == 0 else "." + str(i)}', ''
-                            )[line_number],
-                            pure_substance=PureSubstanceSection(
-                                name=growth_run_file.get(
-                                    f'Gas Material{"" if i == 0 else "." + str(i)}', ''
-                                )[line_number]
-                            ),
-                        ),
-                    ],
-                    vapor_source=GasLineEvaporator(
-                        total_flow_rate=VolumetricFlowRate(
-                            set_value=pd.Series(
-                                [
-                                    growth_run_file.get(
-                                        f'Gas MFC{"" if i == 0 else "." + str(i)}', 0
-                                    )[line_number]
-                                ]
-                            ),
-                        ),
+    for material, mfc, molar_flux in column_groups.values(
+        line_number, gas_source_quantities
+    ):
+        gas_sources.append(
+            GasLineSource(
+                name=material,
+                material=[
+                    PureSubstanceComponent(
+                        substance_name=material,
+                        pure_substance=PureSubstanceSection(name=material),
                     ),
-                    vapor_molar_flow_rate=MolarFlowRate(
-                        set_value=pd.Series(
-                            [
-                                growth_run_file.get(
-                                    f'Gas Molar Flux{"" if i == 0 else "." + str(i)}',
-                                    0,
-                                )[line_number]
-                            ]
-                        )
-                        * ureg('mol / minute').to('mol / second').magnitude,
+                ],
+                vapor_source=GasLineEvaporator(
+                    total_flow_rate=VolumetricFlowRate(
+                        set_value=pd.Series([mfc]),
                     ),
-                )
+                ),
+                vapor_molar_flow_rate=MolarFlowRate(
+                    set_value=pd.Series([molar_flux])
+                    * ureg('mol / minute').to('mol / second').magnitude,
+                ),
             )
-            i += 1
-        else:
-            break
+        )
     return gas_sources
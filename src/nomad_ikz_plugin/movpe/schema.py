@@ -1052,56 +1052,35 @@ def fill_values(
     time_series_key: str,
     dictionary: dict,
 ):
-    if (
-        hasattr(subsection, time_series_quantity)
-        and hasattr(getattr(subsection, time_series_quantity), 'set_value')
-        and hasattr(
-            getattr(getattr(subsection, time_series_quantity), 'set_value'), 'm'
-        )
-        and hasattr(getattr(subsection, time_series_quantity), 'set_time')
-        and hasattr(getattr(getattr(subsection, time_series_quantity), 'set_time'), 'm')
-    ):
-        if time_series_key not in dictionary:
-            dictionary[time_series_key] = {
-                'set_value': np.array([]),
-                'set_time': np.array([]),
-                'value': np.array([]),
-                'time': np.array([]),
-            }
-        dictionary[time_series_key]['set_value'] = np.append(
-            dictionary[time_series_key]['set_value'],
-            getattr(
-                getattr(getattr(subsection, time_series_quantity), 'set_value'), 'm'
-            ),
-        )
-        dictionary[time_series_key]['set_time'] = np.append(
-            dictionary[time_series_key]['set_time'],
-            getattr(
-                getattr(getattr(subsection, time_series_quantity), 'set_time'), 'm'
-            ),
-        )
-    if (
-        hasattr(subsection, time_series_quantity)
-        and hasattr(getattr(subsection, time_series_quantity), 'value')
-        and hasattr(getattr(getattr(subsection, time_series_quantity), 'value'), 'm')
-        and hasattr(getattr(subsection, time_series_quantity), 'time')
-        and hasattr(getattr(getattr(subsection, time_series_quantity), 'time'), 'm')
-    ):
-        if time_series_key not in dictionary:
-            dictionary[time_series_key] = {
-                'set_value': np.array([]),
-                'set_time': np.array([]),
-                'value': np.array([]),
-                'time': np.array([]),
-            }
-        dictionary[time_series_key]['value'] = np.append(
-            dictionary[time_series_key]['value'],
-            getattr(getattr(getattr(subsection, time_series_quantity), 'value'), 'm'),
-        )
-        dictionary[time_series_key]['time'] = np.append(
-            dictionary[time_series_key]['time'],
-            getattr(getattr(getattr(subsection, time_series_quantity), 'time'), 'm'),
-        )
+    """
+    Collects the set and measured values and times of a time series of a section in
+    `dictionary` under `time_series_key`. The arrays are collected in lists and
+    concatenated once with `concatenate_values`.
+    """
+    time_series = getattr(subsection, time_series_quantity, None)
+    for value_key, time_key in (('set_value', 'set_time'), ('value', 'time')):
+        value = getattr(time_series, value_key, None)
+        time = getattr(time_series, time_key, None)
+        if hasattr(value, 'm') and hasattr(time, 'm'):
+            chunks = dictionary.setdefault(
+                time_series_key,
+                {'set_value': [], 'set_time': [], 'value': [], 'time': []},
+            )
+            chunks[value_key].append(np.ravel(value.m))
+            chunks[time_key].append(np.ravel(time.m))
+
+
+def concatenate_values(dictionary: dict) -> dict:
+    """
+    Concatenates the arrays collected with `fill_values` for each time series.
+    """
+    return {
+        time_series_key: {
+            key: np.concatenate([np.array([]), *chunks])
+            for key, chunks in time_series.items()
+        }
+        for time_series_key, time_series in dictionary.items()
+    }
 
 
 class GrowthMovpeIKZ(VaporDeposition, PlotSection, EntryData):
@@ -1250,6 +1229,7 @@ class GrowthMovpeIKZ(VaporDeposition, PlotSection, EntryData):
                             f'{source.name} T',
                             parameters,
                         )
+        parameters = concatenate_values(parameters)
 
         # plotly figures
         max_cols = 2
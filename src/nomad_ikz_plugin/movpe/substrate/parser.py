@@ -16,7 +16,9 @@
 # limitations under the License.
 #
 
-import pandas as pd
+from functools import cache
+
+from nomad.config import config
 from nomad.datamodel.data import (
     EntryData,
 )
@@ -46,8 +48,12 @@ from nomad_ikz_plugin.movpe.schema import (
     SubstrateMovpeReference,
 )
 from nomad_ikz_plugin.utils import (
+    ColumnGroups,
     create_archive,
-    typed_df_value,
+    dataframe_records,
+    open_excel,
+    read_excel_sheet,
+    typed_value,
 )
 
 from .utils import (
@@ -55,17 +61,19 @@ from .utils import (
     populate_element,
 )
 
+configuration = config.get_plugin_entry_point('nomad_ikz_plugin.movpe.substrate:parser')
+
 
 def safe_float(value):
     return float(value) if value is not None else 0.0
 
 
+@cache
 def handle_miller(value: str):
     indices = []
     values = list(value.replace(' ', ''))
     while values:
         char = values.pop(0)
-        print(f'char {char}')
         if char == '-':
             char2 = values.pop(0)
             indices.append(-safe_float(char2))
@@ -73,10 +81,9 @@ def handle_miller(value: str):
             indices.append(0)
         else:
             indices.append(safe_float(char))
-    print(f'ind {indices}')
     assert len(indices) == 3, f'Invalid Miller indices: {list(value.replace(" ", ""))}'
 
-    return indices
+    return tuple(indices)
 
 
 class RawFileSubstrateInventory(EntryData):
@@ -91,64 +98,54 @@ class RawFileSubstrateInventory(EntryData):
 
 class MovpeSubstrateParser(MatchingParser):
     def parse(self, mainfile: str, archive: EntryArchive, logger) -> None:
-        filetype = 'yaml'
+        filetype = configuration.archive_format
         data_file = mainfile.split('/')[-1]
         data_file_with_path = mainfile.split('raw/')[-1]
-        xlsx = pd.ExcelFile(mainfile)
-        substrates_file = pd.read_excel(
+        xlsx = open_excel(mainfile)
+        substrates_file = read_excel_sheet(
             xlsx,
             'Substrate',
             comment='#',
         )
         substrates_file.columns = substrates_file.columns.str.strip()
         substrate_list = []
-        for index, substrate_id in enumerate(substrates_file['Substrates']):
+        column_groups = ColumnGroups(substrates_file)
+        for index, row in enumerate(dataframe_records(substrates_file)):
+            substrate_id = row['Substrates']
             # creating Substrate archives
             substrate_filename = (
                 f'{substrate_id}_{index}.SubstrateIKZ.archive.{filetype}'
             )
+            orientation = handle_miller(typed_value(row.get('Orientation'), str))
+            miscut_orientation = handle_miller(
+                typed_value(row.get('Miscut c Orientation'), str)
+            )
 
             substrate_data = SubstrateMovpe(
                 lab_id=substrate_id,
-                supplier=(typed_df_value(substrates_file, 'Supplier', str, index)),
-                supplier_id=(
-                    typed_df_value(substrates_file, 'Polishing Number', str, index)
-                ),
+                supplier=typed_value(row.get('Supplier'), str),
+                supplier_id=typed_value(row.get('Polishing Number'), str),
                 tags=[
-                    typed_df_value(substrates_file, 'Quality', str, index),
-                    typed_df_value(substrates_file, 'Crystal', str, index),
+                    typed_value(row.get('Quality'), str),
+                    typed_value(row.get('Crystal'), str),
                 ],
-                as_received=(
-                    typed_df_value(substrates_file, 'As Received', bool, index)
-                ),
-                etching=(typed_df_value(substrates_file, 'Etching', bool, index)),
-                annealing=(typed_df_value(substrates_file, 'Annealing', bool, index)),
-                re_etching=(typed_df_value(substrates_file, 'Re-Etching', bool, index)),
-                epi_ready=(typed_df_value(substrates_file, 'Epi Ready', bool, index)),
-                quality=(typed_df_value(substrates_file, 'Quality', bool, index)),
-                description=f'{typed_df_value(substrates_file, "Substrate Box", bool, index)} {typed_df_value(substrates_file, "Substrate Index", bool, index)}',
+                as_received=typed_value(row.get('As Received'), bool),
+                etching=typed_value(row.get('Etching'), bool),
+                annealing=typed_value(row.get('Annealing'), bool),
+                re_etching=typed_value(row.get('Re-Etching'), bool),
+                epi_ready=typed_value(row.get('Epi Ready'), bool),
+                quality=typed_value(row.get('Quality'), bool),
+                description=f'{typed_value(row.get("Substrate Box"), bool)} {typed_value(row.get("Substrate Index"), bool)}',
                 geometry=Parallelepiped(
-                    width=(typed_df_value(substrates_file, 'Size X', float, index)),
-                    length=(typed_df_value(substrates_file, 'Size Y', float, index)),
+                    width=typed_value(row.get('Size X'), float),
+                    length=typed_value(row.get('Size Y'), float),
                 ),
                 crystal_properties=SubstrateCrystalProperties(
                     surface_orientation=CrystallographicDirection(
                         hkl_reciprocal=MillerIndices(
-                            h_index=handle_miller(
-                                typed_df_value(
-                                    substrates_file, 'Orientation', str, index
-                                )
-                            )[0],
-                            k_index=handle_miller(
-                                typed_df_value(
-                                    substrates_file, 'Orientation', str, index
-                                )
-                            )[1],
-                            l_index=handle_miller(
-                                typed_df_value(
-                                    substrates_file, 'Orientation', str, index
-                                )
-                            )[2],
+                            h_index=orientation[0],
+                            k_index=orientation[1],
+                            l_index=orientation[2],
                         ),
                     ),
                     miscut=[
@@ -156,56 +153,27 @@ class MovpeSubstrateParser(MatchingParser):
                             cartesian_miscut=CartesianMiscut(
                                 reference_orientation=ProjectedMiscutOrientation(
                                     angle=safe_float(
-                                        typed_df_value(
-                                            substrates_file,
-                                            'Miscut c angle',
-                                            float,
-                                            index,
-                                        )
+                                        typed_value(row.get('Miscut c angle'), float)
                                     ),
                                     hkl_reciprocal=MillerIndices(
-                                        h_index=handle_miller(
-                                            typed_df_value(
-                                                substrates_file,
-                                                'Miscut c Orientation',
-                                                str,
-                                                index,
-                                            )
-                                        )[0],
-                                        k_index=handle_miller(
-                                            typed_df_value(
-                                                substrates_file,
-                                                'Miscut c Orientation',
-                                                str,
-                                                index,
-                                            )
-                                        )[1],
-                                        l_index=handle_miller(
-                                            typed_df_value(
-                                                substrates_file,
-                                                'Miscut c Orientation',
-                                                str,
-                                                index,
-                                            )
-                                        )[2],
+                                        h_index=miscut_orientation[0],
+                                        k_index=miscut_orientation[1],
+                                        l_index=miscut_orientation[2],
                                     ),
                                 ),
                                 perpendicular_orientation=ProjectedMiscutOrientation(
                                     angle=safe_float(
-                                        typed_df_value(
-                                            substrates_file,
-                                            'Miscut b angle',
-                                            float,
-                                            index,
-                                        )
+                                        typed_value(row.get('Miscut b angle'), float)
                                     ),
                                 ),
                             ),
                         ),
                     ],
                 ),
-                elemental_composition=populate_element(index, substrates_file),
-                dopants=populate_dopant(index, substrates_file),
+                elemental_composition=populate_element(
+                    index, substrates_file, column_groups
+                ),
+                dopants=populate_dopant(index, substrates_file, column_groups),
             )
 
             substrate_archive = EntryArchive(
@@ -25,65 +25,52 @@ from nomad_material_processing.general import (
     Dopant,
 )
 
+from nomad_ikz_plugin.utils import ColumnGroups
 
-def populate_element(line_number, substrates_file: pd.DataFrame):
+
+def populate_element(
+    line_number, substrates_file: pd.DataFrame, column_groups: ColumnGroups = None
+):
     """
     Populate the GasSource object from the growth run file
     """
+    if column_groups is None:
+        column_groups = ColumnGroups(substrates_file)
     elements = []
     elements_quantities = [
         'Elements',
     ]
-    i = 0
-    while True:
-        if all(
-            f'{key}{"" if i == 0 else "." + str(i)}' in substrates_file.columns
-            for key in elements_quantities
-        ):
-            element = substrates_file.get(
-                f'Elements{"" if i == 0 else "." + str(i)}', ''
-            )[line_number]
-            if not pd.isna(element):
-                elements.append(
-                    ElementalComposition(
-                        element=element,
-                    )
+    for (element,) in column_groups.values(line_number, elements_quantities):
+        if not pd.isna(element):
+            elements.append(
+                ElementalComposition(
+                    element=element,
                 )
-            i += 1
-        else:
-            break
+            )
     return elements
 
 
-def populate_dopant(line_number, substrates_file: pd.DataFrame):
+def populate_dopant(
+    line_number, substrates_file: pd.DataFrame, column_groups: ColumnGroups = None
+):
     """
     Populate the GasSource object from the growth run file
     """
+    if column_groups is None:
+        column_groups = ColumnGroups(substrates_file)
     dopants = []
     dopant_quantities = [
         'Doping species',
         'Doping Level',
     ]
-    i = 0
-    while True:
-        if all(
-            f'{key}{"" if i == 0 else "." + str(i)}' in substrates_file.columns
-            for key in dopant_quantities
-        ):
-            doping_species = substrates_file.get(
-                f'Doping species{"" if i == 0 else "." + str(i)}', ''
-            )[line_number]
-            doping_level = substrates_file.get(
-                f'Doping Level{"" if i == 0 else "." + str(i)}', ''
-            )[line_number]
-            if not pd.isna(doping_species):
-                dopants.append(
-                    Dopant(
-                        element=doping_species,
-                        doping_level=doping_level,
-                    )
+    for doping_species, doping_level in column_groups.values(
+        line_number, dopant_quantities
+    ):
+        if not pd.isna(doping_species):
+            dopants.append(
+                Dopant(
+                    element=doping_species,
+                    doping_level=doping_level,
                 )
-            i += 1
-        else:
-            break
+            )
     return dopants
@@ -20,6 +20,21 @@ from pydantic import Field
 
 
 class PldEntryPoint(SchemaPackageEntryPoint):
+    hdf5_time_series: bool = Field(
+        False,
+        description='Store the time series of the PLD steps in an HDF5 file next to '
+        'the data log instead of inline in the archive.',
+    )
+    plot_max_points: int = Field(
+        5000,
+        description='The maximum number of points per series in the process plot.',
+    )
+    archive_workers: int = Field(
+        4,
+        description='The number of threads used to write the archives of the '
+        'substrates created by a substrate batch.',
+    )
+
     def load(self):
         from nomad_ikz_plugin.pld.schema import m_package
 
@@ -18,13 +18,14 @@
 
 
 import datetime
+import hashlib
+import os
 import re
 from typing import (
     TYPE_CHECKING,
-    Any,
-    Union,
 )
 
+import h5py
 import numpy as np
 import plotly.graph_objects as go
 import pytz
@@ -34,11 +35,13 @@ from nomad.datamodel.data import (
     EntryData,
     EntryDataCategory,
 )
+from nomad.datamodel.hdf5 import HDF5Reference
 from nomad.datamodel.metainfo.annotations import (
     BrowserAnnotation,
     ELNAnnotation,
     ELNComponentEnum,
     Filter,
+    H5WebAnnotation,
     SectionProperties,
 )
 from nomad.datamodel.metainfo.basesections import (
@@ -82,9 +85,6 @@ from nomad_material_processing.general import (
     ThinFilm,
     ThinFilmStack,
 )
-from nomad_material_processing.utils import (
-    create_archive,
-)
 from nomad_material_processing.vapor_deposition.general import (
     ChamberEnvironment,
     GasFlow,
@@ -107,7 +107,13 @@ from nomad_material_processing.vapor_deposition.pvd.pld import (
     PulsedLaserDeposition,
 )
 
+from nomad_ikz_plugin.utils import (
+    ArchiveBatch,
+    min_max_indices,
+)
+
 if TYPE_CHECKING:
+    import pandas as pd
     from nomad.datamodel.datamodel import (
         EntryArchive,
     )
@@ -123,18 +129,235 @@ m_package = SchemaPackage(
 )
 
 
-def read_dlog(file_path: str, logger: 'BoundLogger' = None) -> dict[str, Any]:
+ELOG_COLUMNS = [
+    'time_h',
+    'process',
+]
+DLOG_COLUMNS = [
+    'time_s',
+    'temperature_degc',
+    'pressure2_mbar',
+    'o2_flow_sccm',
+    'n2_ar_flow_sccm',
+    'frequency_hz',
+    'laser_energy_mj',
+    'pressure1_mbar',
+    'zeros',
+]
+PLD_CACHE_SUFFIX = '.cache.npz'
+PLD_HDF5_UNITS = {
+    'time': 's',
+    'pressure': 'Pa',
+    'oxygen_flow': 'm^3/s',
+    'argon_nitrogen_flow': 'm^3/s',
+    'laser_power': 'W',
+    'substrate_temperature': 'K',
+}
+PLD_HASH_CHUNK_SIZE = 1 << 20
+ELOG_TIME_PATTERN = r'^\s*(?P<hours>\d+):(?P<minutes>\d+):(?P<seconds>\d+)\s*$'
+ELOG_EVENT_PATTERN = (
+    r'^\s*(?:Starting Process with Recipe :(?P<recipe>.*?)'
+    r'|(?P<pulses>\d+) Laser-pulse fired on target'
+    r'|(?P<abort>.*Abort Button pressed.*))\s*$'
+)
+RECIPE_PATTERN = (
+    r'^(?P<recipe_step>[a-z]*?)(?P<target>[A-Z]*)(?P<temperature_degc>\d*)$'
+)
+
+
+def read_dlog(file_path: str, logger: 'BoundLogger' = None) -> dict[str, np.ndarray]:
     """
     Function for reading the dlog of an IKZ PLD process.
+    The dlog is a tab separated file without header containing the nine columns listed
+    in `DLOG_COLUMNS` in scientific notation. The file is memory-mapped and parsed
+    directly into float64 arrays, one for each column.
 
     Args:
         file_path (str): The path to the PLD dlog file.
         logger (BoundLogger, optional): A structlog logger. Defaults to None.
 
     Returns:
-        dict[str, Any]: The flog data in a Python dictionary.
+        dict[str, np.ndarray]: The dlog data as a dictionary of column arrays with the
+            keys given by `DLOG_COLUMNS`.
+    """
+    import pandas as pd
+
+    df_data = pd.read_csv(
+        file_path,
+        sep='\t',
+        names=DLOG_COLUMNS,
+        header=None,
+        index_col=False,
+        dtype=np.float64,
+        engine='c',
+        memory_map=True,
+    )
+    if logger is not None and df_data.empty:
+        logger.warning(f'No data found in the PLD data log "{file_path}".')
+    return {column: df_data[column].to_numpy() for column in DLOG_COLUMNS}
+
+
+def elog_steps(
+    df_recipe: 'pd.DataFrame', logger: 'BoundLogger' = None
+) -> tuple['pd.DataFrame', float]:
+    """
+    Function for extracting the steps from the elog of an IKZ PLD process.
+    Each step in the elog consists of a line starting the recipe, a line with the
+    number of laser pulses fired and a line completing the event. The time stamps are
+    converted with integer arithmetic on the whole column and all lines are classified
+    with a single pass of a regular expression. Lines with malformed time stamps and
+    lines of aborted events are skipped, and steps without a line with the number of
+    pulses are assigned zero pulses.
+
+    Args:
+        df_recipe (pd.DataFrame): The elog with the columns `ELOG_COLUMNS`.
+        logger (BoundLogger, optional): A structlog logger. Defaults to None.
+
+    Returns:
+        tuple[pd.DataFrame, float]: The steps with the columns `time_s`, `duration_s`,
+            `pulses`, `recipe`, `recipe_step`, `target` and `temperature_degc` and the
+            process time of the last line of the elog in seconds.
+    """
+    import pandas as pd
+
+    time_h = df_recipe['time_h'].astype(str).str.extract(ELOG_TIME_PATTERN)
+    valid = time_h.notna().all(axis=1).to_numpy()
+    if logger is not None and not valid.all():
+        logger.warning(f'Skipped {np.sum(~valid)} lines with malformed time stamps.')
+    time_h = time_h[valid].astype(np.int64).to_numpy()
+    time_s = (time_h[:, 0] * 60 + time_h[:, 1]) * 60 + time_h[:, 2]
+    events = df_recipe['process'][valid].astype(str).str.extract(ELOG_EVENT_PATTERN)
+    is_abort = events['abort'].notna().to_numpy()
+    time_s = time_s[~is_abort]
+    events = events[~is_abort]
+    starts = np.flatnonzero(events['recipe'].notna().to_numpy())
+    pulse_lines = np.flatnonzero(events['pulses'].notna().to_numpy())
+    # The first line with pulses after each start belongs to the step if it comes
+    # before the start of the next step.
+    next_starts = np.append(starts[1:], len(events))
+    pulse_index = np.searchsorted(pulse_lines, starts)
+    has_pulses = pulse_index < len(pulse_lines)
+    pulse_line = np.full(len(starts), len(events))
+    pulse_line[has_pulses] = pulse_lines[pulse_index[has_pulses]]
+    has_pulses &= pulse_line < next_starts
+    pulses = np.zeros(len(starts), dtype=np.int64)
+    pulses[has_pulses] = (
+        events['pulses'].to_numpy()[pulse_line[has_pulses]].astype(np.int64)
+    )
+    # Each step lasts until the line following its start.
+    duration_s = np.full(len(starts), np.nan)
+    has_end = starts + 1 < len(time_s)
+    duration_s[has_end] = time_s[starts[has_end] + 1] - time_s[starts[has_end]]
+    recipe = events['recipe'].to_numpy()[starts].astype(str)
+    df_steps = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    'time_s': time_s[starts],
+                    'duration_s': duration_s,
+                    'pulses': pulses,
+                    'recipe': recipe,
+                }
+            ),
+            pd.Series(recipe, dtype=str).str.extract(RECIPE_PATTERN),
+        ],
+        axis=1,
+    )
+    df_steps['temperature_degc'] = pd.to_numeric(
+        df_steps['temperature_degc'], errors='coerce'
+    )
+    end_s = float(time_s[-1]) if len(time_s) > 0 else np.nan
+    return df_steps, end_s
+
+
+def hash_raw_files(archive: 'EntryArchive', file_names: list[str]) -> str:
+    """
+    Function for computing a hash of the content of raw files in the upload. The name
+    and the size of each file are hashed before its content, so that moving bytes
+    from one file to the next changes the hash.
+
+    Args:
+        archive (EntryArchive): The archive providing the context of the upload.
+        file_names (list[str]): The paths of the raw files relative to the upload.
+
+    Returns:
+        str: The hex digest of the SHA-256 hash of the file contents.
+    """
+    content_hash = hashlib.sha256()
+    for file_name in file_names:
+        with archive.m_context.raw_file(file_name, 'rb') as file:
+            size = file.seek(0, os.SEEK_END)
+            file.seek(0)
+            content_hash.update(f'{file_name}\0{size}\0'.encode())
+            for chunk in iter(lambda: file.read(PLD_HASH_CHUNK_SIZE), b''):
+                content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def read_pld_logs(
+    archive: 'EntryArchive',
+    recipe_log: str,
+    data_log: str,
+    logger: 'BoundLogger',
+) -> tuple['pd.DataFrame', 'pd.DataFrame']:
+    """
+    Function for reading the recipe (.elog) and data (.dlog) logs of an IKZ PLD process.
+    The parsed logs are cached in a `.npz` file next to the data log which is keyed by
+    the hash of the content of both logs. As long as the logs are unchanged, the
+    parsed data is loaded from the cache instead of parsing the logs again.
+
+    Args:
+        archive (EntryArchive): The archive providing the context of the upload.
+        recipe_log (str): The path of the recipe log relative to the upload.
+        data_log (str): The path of the data log relative to the upload.
+        logger (BoundLogger): A structlog logger.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The recipe log with the columns
+            `ELOG_COLUMNS` and the data log with the columns `DLOG_COLUMNS`.
     """
-    raise NotImplementedError
+    import pandas as pd
+
+    cache_file = f'{data_log}{PLD_CACHE_SUFFIX}'
+    key = hash_raw_files(archive, [recipe_log, data_log])
+    if archive.m_context.raw_path_exists(cache_file):
+        try:
+            with archive.m_context.raw_file(cache_file, 'rb') as file:
+                with np.load(file, allow_pickle=False) as cache:
+                    if str(cache['key']) == key:
+                        df_recipe = pd.DataFrame(
+                            {column: cache[f'elog_{column}'] for column in ELOG_COLUMNS}
+                        )
+                        df_data = pd.DataFrame(
+                            {column: cache[f'dlog_{column}'] for column in DLOG_COLUMNS}
+                        )
+                        return df_recipe, df_data
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f'Could not read the PLD log cache "{cache_file}": {e}')
+
+    with archive.m_context.raw_file(recipe_log, 'r') as e_log:
+        df_recipe = pd.read_csv(
+            e_log,
+            sep='\t',
+            names=ELOG_COLUMNS,
+            header=None,
+        )
+    with archive.m_context.raw_file(data_log) as d_log:
+        dlog = read_dlog(d_log.name, logger)
+    try:
+        with archive.m_context.raw_file(cache_file, 'wb') as file:
+            np.savez(
+                file,
+                key=np.array(key),
+                **{
+                    f'elog_{column}': df_recipe[column].to_numpy(dtype=str)
+                    for column in ELOG_COLUMNS
+                },
+                **{f'dlog_{column}': dlog[column] for column in DLOG_COLUMNS},
+            )
+    except OSError as e:
+        logger.warning(f'Could not write the PLD log cache "{cache_file}": {e}')
+    return df_recipe, pd.DataFrame(dlog, copy=False)
 
 
 class IKZPLDCategory(EntryDataCategory):
@@ -440,6 +663,9 @@ class IKZPLDSubstrateBatch(CompositeSystem, EntryData):  # TODO: Inherit from ba
                 self.components = [
                     PureSubstanceComponent(pure_substance=substance_section)
                 ]
+            archive_batch = ArchiveBatch(
+                archive, max_workers=configuration.archive_workers
+            )
             for sub_batch_idx, sub_batch in enumerate(self.sub_batches):
                 if len(sub_batch.substrates) > 0:
                     continue
@@ -488,26 +714,33 @@ class IKZPLDSubstrateBatch(CompositeSystem, EntryData):  # TODO: Inherit from ba
                     logger.warn(
                         'Please provide the substrate miscut orientation in reciprocal space as a string of three integers.'
                     )
+                substrate_template = IKZPLDSubstrate(
+                    geometry=self.geometry,
+                    crystal_properties=crystal_properties,
+                    components=self.components,
+                    supplier_id=self.supplier_batch,
+                    supplier=self.supplier,
+                    dopants=self.dopants,
+                ).m_to_dict(with_root_def=True)
                 sub_batch.substrates = [
                     IKZPLDSubstrateReference(
                         substrate_number=substrate_idx,
-                        substrate=create_archive(
-                            IKZPLDSubstrate(
+                        substrate=archive_batch.add(
+                            dict(
+                                substrate_template,
                                 name=f'{batch_name} {sub_batch.name} substrate-{substrate_idx}',
                                 lab_id=f'{batch_name}_sub-batch-{sub_batch_idx}_substrate-{substrate_idx}',
-                                geometry=self.geometry,
-                                crystal_properties=crystal_properties,
-                                components=self.components,
-                                supplier_id=self.supplier_batch,
-                                supplier=self.supplier,
-                                dopants=self.dopants,
                             ),
-                            archive,
                             file_name % (sub_batch_idx, substrate_idx),
                         ),
                     )
                     for substrate_idx in range(sub_batch.amount)
                 ]
+                logger.info(
+                    f'Creating {sub_batch.amount} substrates for sub batch '
+                    f'{sub_batch_idx + 1} of {len(self.sub_batches)}.'
+                )
+                archive_batch.write(logger)
 
         super().normalize(archive, logger)
 
@@ -589,6 +822,92 @@ class IKZPLDLayer(ThinFilm, EntryData):
     )
 
 
+class IKZPLDPressure(Pressure):
+    """
+    The chamber pressure during a PLD step stored in an HDF5 file.
+    """
+
+    m_def = Section(
+        a_h5web=H5WebAnnotation(axes='time', signal='value', long_name='Pressure')
+    )
+    value = Quantity(
+        type=HDF5Reference,
+        unit='pascal',
+        shape=[],
+    )
+    time = Quantity(
+        type=HDF5Reference,
+        description='The process time when each of the values were recorded.',
+        unit='second',
+        shape=[],
+    )
+
+
+class IKZPLDVolumetricFlowRate(VolumetricFlowRate):
+    """
+    The gas flow rate during a PLD step stored in an HDF5 file.
+    """
+
+    m_def = Section(
+        a_h5web=H5WebAnnotation(axes='time', signal='value', long_name='Flow rate')
+    )
+    value = Quantity(
+        type=HDF5Reference,
+        unit='meter ** 3 / second',
+        shape=[],
+    )
+    time = Quantity(
+        type=HDF5Reference,
+        description='The process time when each of the values were recorded.',
+        unit='second',
+        shape=[],
+    )
+
+
+class IKZPLDSourcePower(SourcePower):
+    """
+    The laser power during a PLD step stored in an HDF5 file.
+    """
+
+    m_def = Section(
+        a_h5web=H5WebAnnotation(axes='time', signal='value', long_name='Laser power')
+    )
+    value = Quantity(
+        type=HDF5Reference,
+        unit='watt',
+        shape=[],
+    )
+    time = Quantity(
+        type=HDF5Reference,
+        description='The process time when each of the values were recorded.',
+        unit='second',
+        shape=[],
+    )
+
+
+class IKZPLDTemperature(Temperature):
+    """
+    The substrate temperature during a PLD step stored in an HDF5 file.
+    """
+
+    m_def = Section(
+        a_h5web=H5WebAnnotation(
+            axes='time', signal='value', long_name='Substrate temperature'
+        )
+    )
+    value = Quantity(
+        type=HDF5Reference,
+        unit='kelvin',
+        shape=[],
+    )
+    time = Quantity(
+        type=HDF5Reference,
+        description='The process time when each of the values were recorded.',
+        unit='second',
+        shape=[],
+    )
+
+
 class IKZPLDStep(PLDStep):
     """
     Application definition section for a step in a pulsed laser deposition process at IKZ.
@@ -646,6 +965,13 @@ class IKZPLDStep(PLDStep):
         ),
         unit='meter',
     )
+    _fingerprint = Quantity(
+        type=str,
+        description="""
+        The hash of the inputs the step was created from. Used to reuse the step if
+        the inputs are unchanged when the process is normalized again.
+        """,
+    )
 
     def normalize(self, archive: 'EntryArchive', logger: 'BoundLogger') -> None:
         """
@@ -665,20 +991,95 @@ class IKZPLDStep(PLDStep):
                 ]
 
 
-def time_convert(x: Union[str, int]) -> int:
+def step_windows(
+    time_s: np.ndarray, start_s: np.ndarray, end_s: np.ndarray
+) -> list[slice]:
     """
-    Help function for converting time stamps in log file to seconds.
+    Help function for finding the rows of the data log belonging to each step.
+    The step boundaries are located with a binary search so the time column is only
+    traversed once instead of once per step. The returned slices select all rows with
+    `start_s <= time_s < end_s` and can be used with `DataFrame.iloc` to get views of
+    the data without copying it.
 
     Args:
-        x (Union[str, int]): The time in the format %h:%m:%s.
+        time_s (np.ndarray): The time stamps of the data log in ascending order.
+        start_s (np.ndarray): The start times of the steps.
+        end_s (np.ndarray): The end times of the steps (exclusive).
 
     Returns:
-        int: The time in seconds.
+        list[slice]: A slice of rows for each of the steps.
+    """
+    starts = np.searchsorted(time_s, start_s, side='left')
+    stops = np.searchsorted(time_s, end_s, side='left')
+    return [
+        slice(int(start), int(max(start, stop))) for start, stop in zip(starts, stops)
+    ]
+
+
+def step_fingerprint(values: list, arrays: list[np.ndarray]) -> str:
     """
-    if isinstance(x, int):
-        return x
-    h, m, s = map(int, x.split(':'))
-    return (h * 60 + m) * 60 + s
+    Function for computing a fingerprint of the inputs of a PLD step.
+
+    Args:
+        values (list): The scalar inputs of the step like the recipe row, the target,
+            the target distance and the layer properties.
+        arrays (list[np.ndarray]): The rows of the time series belonging to the step.
+
+    Returns:
+        str: The hex digest of the SHA-256 hash of the inputs.
+    """
+    fingerprint = hashlib.sha256(repr(values).encode())
+    for array in arrays:
+        fingerprint.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return fingerprint.hexdigest()
+
+
+def write_pld_hdf5(
+    file_path: str,
+    time_s: np.ndarray,
+    series: dict[str, np.ndarray],
+    windows: list[slice],
+) -> None:
+    """
+    Function for writing the time series of a PLD process to an HDF5 file.
+    The full series are written once to the `/process` group sharing a single `time`
+    dataset. For each step a group `/steps/<index>` is created containing virtual
+    datasets that map the rows of the step onto the `/process` datasets, so the data
+    is stored only once.
+
+    Args:
+        file_path (str): The path of the HDF5 file to write.
+        time_s (np.ndarray): The process time of the data log in seconds.
+        series (dict[str, np.ndarray]): The time series in SI units with the keys of
+            `PLD_HDF5_UNITS`.
+        windows (list[slice]): The rows of the data log belonging to each step.
+    """
+    length = len(time_s)
+    with h5py.File(file_path, 'w') as hdf:
+        hdf.attrs['NX_class'] = 'NXroot'
+        process = hdf.create_group('process')
+        process.attrs['NX_class'] = 'NXdata'
+        process.attrs['axes'] = 'time'
+        process.attrs['signal'] = 'pressure'
+        for name, values in {'time': time_s, **series}.items():
+            dataset = process.create_dataset(name, data=values, dtype=np.float64)
+            dataset.attrs['units'] = PLD_HDF5_UNITS[name]
+        steps = hdf.create_group('steps')
+        for index, window in enumerate(windows):
+            group = steps.create_group(str(index))
+            group.attrs['NX_class'] = 'NXdata'
+            group.attrs['axes'] = 'time'
+            group.attrs['signal'] = 'pressure'
+            for name in process:
+                layout = h5py.VirtualLayout(
+                    shape=(window.stop - window.start,), dtype=np.float64
+                )
+                if window.stop > window.start:
+                    layout[:] = h5py.VirtualSource(
+                        '.', f'/process/{name}', shape=(length,)
+                    )[window]
+                dataset = group.create_virtual_dataset(name, layout)
+                dataset.attrs['units'] = PLD_HDF5_UNITS[name]
 
 
 class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
@@ -822,74 +1223,124 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
         """,
     )
 
-    def plot(self) -> None:
+    def plot(
+        self,
+        time_s: np.ndarray = None,
+        series: dict[str, np.ndarray] = None,
+        windows: list[slice] = None,
+    ) -> None:
         """
         Method for plotting the section.
+        Each series is downsampled per step to its share of the `plot_max_points`
+        configured for the PLD schema, keeping the minimum and maximum of consecutive
+        buckets of points so peaks in the data stay visible.
+
+        Args:
+            time_s (np.ndarray, optional): The process time of the data log in seconds.
+            series (dict[str, np.ndarray], optional): The `pressure`, `laser_power` and
+                `substrate_temperature` of the data log in SI units.
+            windows (list[slice], optional): The rows of the data log belonging to each
+                step. If any of the arguments is missing, the series stored inline in
+                the steps are plotted.
         """
-        fig = go.Figure()
-        x0 = None
-        y0 = None
-        y20 = None
-        y30 = None
-        shapes = []
-        for step in self.steps:
-            x = step.environment.pressure.time.to('second').magnitude
-            y = step.environment.pressure.value.to('mbar').magnitude
-            y2 = step.sources[0].vapor_source.power.value.to('watt').magnitude
-            y3 = (
-                step.sample_parameters[0]
-                .substrate_temperature.value.to('celsius')
-                .magnitude
-            )
-            if x0 is not None:
-                x = np.insert(x, 0, x0)
-                y = np.insert(y, 0, y0)
-                y2 = np.insert(y2, 0, y20)
-                y3 = np.insert(y3, 0, y30)
-            fig.add_trace(
-                go.Scatter(
-                    x=x,
-                    y=y,
-                    name=step.name,
-                    line=dict(color='#2A4CDF', width=2),
-                    yaxis='y',
+        names = [step.name for step in self.steps]
+        if time_s is None or series is None or windows is None:
+            steps = [
+                step
+                for step in self.steps
+                if not isinstance(step.environment.pressure.time, str)
+            ]
+            names = [step.name for step in steps]
+            times = [
+                step.environment.pressure.time.to('second').magnitude for step in steps
+            ]
+            stops = np.cumsum([len(time) for time in times], dtype=int)
+            windows = [
+                slice(int(stop) - len(time), int(stop))
+                for stop, time in zip(stops, times)
+            ]
+            time_s = np.concatenate([np.empty(0), *times])
+            series = dict(
+                pressure=np.concatenate(
+                    [
+                        np.empty(0),
+                        *(
+                            step.environment.pressure.value.to('pascal').magnitude
+                            for step in steps
+                        ),
+                    ]
                 ),
-            )
-            fig.add_trace(
-                go.Scatter(
-                    x=x,
-                    y=y3,
-                    name=step.name,
-                    line=dict(color='#008A68', width=2),
-                    yaxis='y3',
+                laser_power=np.concatenate(
+                    [
+                        np.empty(0),
+                        *(
+                            step.sources[0]
+                            .vapor_source.power.value.to('watt')
+                            .magnitude
+                            for step in steps
+                        ),
+                    ]
                 ),
-            )
-            fig.add_trace(
-                go.Scatter(
-                    x=x,
-                    y=y2,
-                    name=step.name,
-                    line=dict(color='#192E87', width=2),
-                    yaxis='y2',
+                substrate_temperature=np.concatenate(
+                    [
+                        np.empty(0),
+                        *(
+                            step.sample_parameters[0]
+                            .substrate_temperature.value.to('kelvin')
+                            .magnitude
+                            for step in steps
+                        ),
+                    ]
                 ),
             )
+        traces = [
+            # (series, scale, offset, color, y axis) for plotting in mbar, °C and W
+            ('pressure', 1e-2, 0, '#2A4CDF', 'y'),
+            ('substrate_temperature', 1, -273.15, '#008A68', 'y3'),
+            ('laser_power', 1, 0, '#192E87', 'y2'),
+        ]
+        max_points = configuration.plot_max_points
+        total_points = max(len(time_s), 1)
+        fig = go.Figure()
+        previous = None
+        shapes = []
+        for name, window in zip(names, windows):
+            if window.stop <= window.start:
+                continue
+            step_points = max(
+                int(max_points * (window.stop - window.start) / total_points), 2
+            )
+            for key, scale, offset, color, yaxis in traces:
+                indices = window.start + min_max_indices(
+                    series[key][window], step_points
+                )
+                if previous is not None:
+                    indices = np.concatenate(([previous], indices))
+                fig.add_trace(
+                    go.Scattergl(
+                        x=time_s[indices],
+                        y=series[key][indices] * scale + offset,
+                        name=name,
+                        line=dict(color=color, width=2),
+                        yaxis=yaxis,
+                    ),
+                )
+            x_start = time_s[window.start if previous is None else previous]
+            x_end = time_s[window.stop - 1]
             fig.add_annotation(
-                text=step.name,
+                text=name,
                 yref='paper',
-                x=(x[0] + (x[-1] - x[0]) / 2),
+                x=(x_start + (x_end - x_start) / 2),
                 y=0.85,
                 showarrow=False,
                 textangle=-90,
             )
-            x0 = x[-1]
-            y0 = y[-1]
-            y20 = y2[-1]
-            y30 = y3[-1]
+            previous = window.stop - 1
             shapes.append(
                 dict(
                     type='line',
-                    x0=x[-1],
-                    x1=x[-1],
+                    x0=x_end,
+                    x1=x_end,
                     y0=0,
                     y1=1,
                     xref='x',
@@ -971,9 +1422,11 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
         """
         self.figures = []
         layers = {}
+        time_s = None
+        series = None
+        windows = None
         if self.data_log and self.recipe_log:
             import numpy as np
-            import pandas as pd
             from nomad.units import ureg
 
             pattern = re.compile(
@@ -995,43 +1448,60 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                 self.process_identifiers.normalize(archive, logger)
                 self.lab_id = self.process_identifiers.lab_id
 
-            with archive.m_context.raw_file(self.recipe_log, 'r') as e_log:
-                df_recipe = pd.read_csv(
-                    e_log,
-                    sep='\t',
-                    names=['time_h', 'process'],
-                    header=None,
+            df_recipe, df_data = read_pld_logs(
+                archive, self.recipe_log, self.data_log, logger
+            )
+            df_steps, end_s = elog_steps(df_recipe, logger)
+            self.end_time = self.datetime + datetime.timedelta(seconds=end_s)
+            if not df_data['time_s'].is_monotonic_increasing:
+                df_data = df_data.sort_values(
+                    'time_s', kind='stable', ignore_index=True
                 )
-            df_recipe = df_recipe[
-                ~df_recipe['process'].str.contains('Abort Button pressed')
-            ]
-            df_recipe['time_s'] = df_recipe['time_h'].apply(time_convert)
-            df_recipe['duration_s'] = df_recipe['time_s'].diff(-1) * -1
-            df_steps = df_recipe.iloc[1:-1:3, :].copy()
-            df_steps['pulses'] = (
-                df_recipe.iloc[2:-1:3, 1].str.split().str[0].values.astype(int)
+            df_data['pressure_mbar'] = df_data['pressure1_mbar'].mask(
+                (0.01 <= df_data['pressure1_mbar'])
+                & (df_data['pressure1_mbar'] <= 0.1),
+                df_data['pressure2_mbar'],
             )
-            df_steps['recipe'] = df_steps['process'].str.split(':').str[1]
-            self.end_time = self.datetime + datetime.timedelta(
-                seconds=float(df_recipe.iloc[-1, 2]),
+            windows = step_windows(
+                df_data['time_s'].to_numpy(),
+                df_steps['time_s'].to_numpy(),
+                (df_steps['time_s'] + df_steps['duration_s']).to_numpy(),
             )
-            columns = [
-                'time_s',
-                'temperature_degc',
-                'pressure2_mbar',
-                'o2_flow_sccm',
-                'n2_ar_flow_sccm',
-                'frequency_hz',
-                'laser_energy_mj',
-                'pressure1_mbar',
-                'zeros',
-            ]
-            with archive.m_context.raw_file(self.data_log, 'r') as d_log:
-                df_data = pd.read_csv(
-                    d_log,
-                    sep='\t',
-                    names=columns,
+            time_s = df_data['time_s'].to_numpy()
+            series = {
+                'pressure': ureg.Quantity(
+                    df_data['pressure_mbar'].to_numpy(), ureg('mbar')
                 )
+                .to('pascal')
+                .magnitude,
+                'oxygen_flow': ureg.Quantity(
+                    df_data['o2_flow_sccm'].to_numpy(), ureg('cm ** 3 / minute')
+                )
+                .to('meter ** 3 / second')
+                .magnitude,
+                'argon_nitrogen_flow': ureg.Quantity(
+                    df_data['n2_ar_flow_sccm'].to_numpy(), ureg('cm ** 3 / minute')
+                )
+                .to('meter ** 3 / second')
+                .magnitude,
+                'laser_power': df_data['laser_energy_mj'].to_numpy()
+                * 1e-3
+                * df_data['frequency_hz'].to_numpy(),
+                'substrate_temperature': df_data['temperature_degc'].to_numpy()
+                + 273.15,
+            }
+            if configuration.hdf5_time_series:
+                hdf_filename = f'{self.data_log.rsplit(".", 1)[0]}.h5'
+                pressure_cls = IKZPLDPressure
+                flow_rate_cls = IKZPLDVolumetricFlowRate
+                power_cls = IKZPLDSourcePower
+                temperature_cls = IKZPLDTemperature
+            else:
+                hdf_filename = None
+                pressure_cls = Pressure
+                flow_rate_cls = VolumetricFlowRate
+                power_cls = SourcePower
+                temperature_cls = Temperature
             substrate_ref = None
             sample_id = None
             if isinstance(self.substrate, MProxy):
@@ -1052,55 +1522,116 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                 target_distances = [None] * len(df_steps)
             distance_counter = 0
             prop_counter = 0
-            for target_distance, (_, row) in zip(target_distances, df_steps.iterrows()):
+            archive_batch = ArchiveBatch(archive)
+            for step_index, (target_distance, window, (_, row)) in enumerate(
+                zip(target_distances, windows, df_steps.iterrows())
+            ):
                 if target_distance is not None:
                     target_distance = target_distance.to('meter').magnitude
-                step_pattern = re.compile(
-                    r'^(?P<step>[a-z]*?)(?P<target>[A-Z]*)(?P<temp>\d*)$'
-                )
-                step_match = step_pattern.match(row['recipe'])
                 target = None
                 target_name = None
                 try:
-                    target = self.targets[
-                        target_recipe_names.index(step_match['target'])
-                    ]
+                    target = self.targets[target_recipe_names.index(row['target'])]
                     target_name = f'Target: {target.name}'
                 except ValueError:
-                    logger.warning(
-                        f'Target {step_match["target"]} not found in target list.'
-                    )
+                    logger.warning(f'Target {row["target"]} not found in target list.')
                     target = None
-                    target_name = f'Unknown {step_match["target"]} target'
-                data = df_data.loc[
-                    (row['time_s'] <= df_data['time_s'])
-                    & (df_data['time_s'] < (row['time_s'] + row['duration_s']))
-                ].copy()
-                data['pressure_mbar'] = data['pressure1_mbar']
-                p2_range = (0.01 <= data['pressure_mbar']) & (
-                    data['pressure_mbar'] <= 0.1
-                )
-                data.loc[p2_range, 'pressure_mbar'] = data.loc[
-                    p2_range, 'pressure2_mbar'
-                ]
+                    target_name = f'Unknown {row["target"]} target'
+                data = df_data.iloc[window]
                 mean_laser_energy = data['laser_energy_mj'].replace(0, np.NaN).mean()
                 if np.isnan(mean_laser_energy):
                     attenuation = 1
                 else:
-                    attenuation = self.attenuated_laser_energy / (
+                    attenuation = self.attenuated_laser_energy.to('joule').magnitude / (
                         mean_laser_energy * 1e-3
                     )
+                series['laser_power'][window] *= attenuation
                 creates_new_thin_film = row['pulses'] > 0
+                if creates_new_thin_film:
+                    if self.target_distances is not None:
+                        if distance_counter < len(self.target_distances):
+                            target_distance = self.target_distances[distance_counter]
+                        else:
+                            target_distance = self.target_distances[-1]
+                    distance_counter += 1
+                layer_id = None
+                thickness = None
+                rms = None
+                if (
+                    creates_new_thin_film
+                    and target_distance is not None
+                    and sample_id is not None
+                ):
+                    layer_id = f'{sample_id}-L{len(layers) + 1}'
+                    if substrate_ref is not None and substrate_ref.geometry is not None:
+                        if self._thicknesses is not None and prop_counter < len(
+                            self._thicknesses
+                        ):
+                            thickness = self._thicknesses[prop_counter]
+                        if (
+                            self._rms is not None
+                            and prop_counter < len(self._rms)
+                            and not np.isnan(self._rms[prop_counter])
+                        ):
+                            rms = self._rms[prop_counter]
+                        prop_counter += 1
+                fingerprint = step_fingerprint(
+                    [
+                        step_index,
+                        row['recipe'],
+                        row['pulses'],
+                        row['time_s'],
+                        row['duration_s'],
+                        hdf_filename,
+                        sample_id,
+                        layer_id,
+                        target_name,
+                        target_distance,
+                        thickness,
+                        rms,
+                        self.attenuated_laser_energy,
+                        self.laser_spot_size,
+                        [
+                            element.m_to_dict()
+                            for element in getattr(target, 'elemental_composition', [])
+                        ],
+                        getattr(substrate_ref, 'geometry', None)
+                        and substrate_ref.geometry.m_to_dict(),
+                    ],
+                    [time_s[window], *(values[window] for values in series.values())],
+                )
+                previous_fingerprint = None
+                if step_index < len(self.steps):
+                    previous_fingerprint = self.steps[step_index]._fingerprint
+                thin_film = None
+                if layer_id is not None:
+                    thin_film = archive_batch.reference(f'{layer_id}.archive.json')
+                if previous_fingerprint == fingerprint and (
+                    thin_film is None
+                    or archive.m_context.raw_path_exists(f'{layer_id}.archive.json')
+                ):
+                    if layer_id is not None:
+                        layers[f'{sample_id} Layer {len(layers) + 1}'] = thin_film
+                    steps.append(self.steps[step_index])
+                    continue
+                if hdf_filename is not None:
+                    hdf5_path = (
+                        f'/uploads/{archive.m_context.upload_id}/raw/{hdf_filename}'
+                        f'#/steps/{step_index}'
+                    )
+                    time_series = {
+                        name: dict(
+                            value=f'{hdf5_path}/{name}', time=f'{hdf5_path}/time'
+                        )
+                        for name in series
+                    }
+                else:
+                    time_series = {
+                        name: dict(value=values[window], time=time_s[window])
+                        for name, values in series.items()
+                    }
                 evaporation_source = PLDLaser(
-                    power=SourcePower(
-                        value=(
-                            data['laser_energy_mj']
-                            * 1e-3
-                            * data['frequency_hz']
-                            * attenuation
-                        ),
-                        time=data['time_s'],
-                    ),
+                    power=power_cls(**time_series['laser_power']),
                     wavelength=248e-9,
                     repetition_rate=data['frequency_hz'].mean(),
                     spot_size=self.laser_spot_size.magnitude,
@@ -1108,12 +1639,6 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                 )
                 target_source = []
                 if creates_new_thin_film:
-                    if self.target_distances is not None:
-                        if distance_counter < len(self.target_distances):
-                            target_distance = self.target_distances[distance_counter]
-                        else:
-                            target_distance = self.target_distances[-1]
-                    distance_counter += 1
                     target_source = [
                         IKZPLDTargetComponent(
                             name=target_name,
@@ -1125,50 +1650,21 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                     material=target_source,
                 )
                 environment = ChamberEnvironment(
-                    pressure=Pressure(
-                        value=ureg.Quantity(
-                            data['pressure_mbar'].values,
-                            ureg('mbar'),
-                        )
-                        .to('Pa')
-                        .magnitude,
-                        time=data['time_s'],
-                    ),
+                    pressure=pressure_cls(**time_series['pressure']),
                     gas_flow=[
                         GasFlow(
                             gas=PubChemPureSubstanceSection(pub_chem_cid=977),
-                            flow_rate=VolumetricFlowRate(
-                                value=ureg.Quantity(
-                                    data['o2_flow_sccm'].values,
-                                    ureg('cm ** 3 / minute'),
-                                )
-                                .to('meter ** 3 / second')
-                                .magnitude,
-                                time=data['time_s'],
-                            ),
+                            flow_rate=flow_rate_cls(**time_series['oxygen_flow']),
                         ),
                         GasFlow(
                             gas=PureSubstanceSection(name='Argon/Nitrogen'),
-                            flow_rate=VolumetricFlowRate(
-                                value=ureg.Quantity(
-                                    data['n2_ar_flow_sccm'].values,
-                                    ureg('cm ** 3 / minute'),
-                                )
-                                .to('meter ** 3 / second')
-                                .magnitude,
-                                time=data['time_s'],
+                            flow_rate=flow_rate_cls(
+                                **time_series['argon_nitrogen_flow']
                             ),
                         ),
                     ],
                 )
-                thin_film = None
-                if (
-                    creates_new_thin_film
-                    and target_distance is not None
-                    and sample_id is not None
-                ):
-                    layer_count = len(layers) + 1
-                    layer_id = f'{sample_id}-L{layer_count}'
+                if layer_id is not None:
                     elemental_composition = []
                     if target is not None:
                         elemental_composition = target.elemental_composition
@@ -1176,21 +1672,14 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                         geometry = RoughParallelepiped()
                         geometry.width = substrate_ref.geometry.width
                         geometry.length = substrate_ref.geometry.length
-                        if self._thicknesses is not None and prop_counter < len(
-                            self._thicknesses
-                        ):
-                            geometry.height = self._thicknesses[prop_counter]
-                        if (
-                            self._rms is not None
-                            and prop_counter < len(self._rms)
-                            and not np.isnan(self._rms[prop_counter])
-                        ):
-                            geometry.roughness = self._rms[prop_counter]
-                        prop_counter += 1
+                        if thickness is not None:
+                            geometry.height = thickness
+                        if rms is not None:
+                            geometry.roughness = rms
                     else:
                         geometry = None
-                    name = f'{sample_id} Layer {layer_count}'
-                    thin_film = create_archive(
+                    name = f'{sample_id} Layer {len(layers) + 1}'
+                    thin_film = archive_batch.add(
                         entity=IKZPLDLayer(
                             name=name,
                             elemental_composition=elemental_composition,
@@ -1211,14 +1700,14 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                             ),
                             geometry=geometry,
                         ),
-                        archive=archive,
                         file_name=f'{layer_id}.archive.json',
+                        # the layer of a step whose inputs changed is recreated
+                        overwrite=previous_fingerprint is not None,
                     )
                     layers[name] = thin_film
                 substrate = PVDSampleParameters(
-                    substrate_temperature=Temperature(
-                        value=data['temperature_degc'] + 273.15,
-                        time=data['time_s'],
+                    substrate_temperature=temperature_cls(
+                        **time_series['substrate_temperature'],
                         measurement_type='Heater thermocouple',
                     ),
                     heater='Resistive element',
@@ -1234,9 +1723,13 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                     sources=[source],
                     sample_parameters=[substrate],
                     environment=environment,
+                    _fingerprint=fingerprint,
                 )
                 step.normalize(archive, logger)
                 steps.append(step)
+            if hdf_filename is not None:
+                with archive.m_context.raw_file(hdf_filename, 'w') as newfile:
+                    write_pld_hdf5(newfile.name, time_s, series, windows)
             self.steps = steps
 
             if isinstance(self.substrate, IKZPLDSubstrate) and len(layers) > 0:
@@ -1252,9 +1745,8 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                 self.samples = [
                     CompositeSystemReference(
                         name=sample_id,
-                        reference=create_archive(
+                        reference=archive_batch.add(
                             entity=sample,
-                            archive=archive,
                             file_name=f'{sample_id}.archive.json',
                         ),
                     )
@@ -1266,6 +1758,7 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
                         reference=self.substrate,
                     )
                 ]
+            archive_batch.write()
             if len(self.samples) > 0:
                 for step in self.steps:
                     step.sample_parameters[0].substrate = ThinFilmStackReference(
@@ -1285,7 +1778,7 @@ class IKZPulsedLaserDeposition(PulsedLaserDeposition, PlotSection, EntryData):
         for name, layer in layers.items():
             archive.workflow2.outputs.append(Link(name=f'Layer: {name}', section=layer))
 
-        self.plot()
+        self.plot(time_s, series, windows)
 
 
 m_package.__init_metainfo__()
@@ -19,11 +19,35 @@
 import json
 import math
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 
+import numpy as np
 import pandas as pd
 import yaml
 from nomad.datamodel.context import ClientContext
 
+try:
+    from yaml import CSafeDumper as YamlDumper
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # PyYAML without LibYAML
+    from yaml import SafeDumper as YamlDumper
+    from yaml import SafeLoader as YamlLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# calamine parses workbooks much faster than openpyxl, it is used if installed
+EXCEL_ENGINE = (
+    'calamine'
+    if find_spec('python_calamine')
+    and tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+    else 'openpyxl'
+)
+
 
 def get_reference(upload_id, entry_id):
     return f'../uploads/{upload_id}/archive/{entry_id}'
@@ -39,12 +63,150 @@ def get_hash_ref(upload_id, filename):
     return f'{get_reference(upload_id, get_entry_id(upload_id, filename))}#data'
 
 
+INDEXING_TIMEOUT = 10.0
+INDEXING_POLL_DELAY = 0.05
+INDEXING_MAX_POLL_DELAY = 1.0
+INDEXING_SETTLE_TIME = 1.0
+
+
+def poll_until(
+    check,
+    *,
+    timeout: float = INDEXING_TIMEOUT,
+    delay: float = INDEXING_POLL_DELAY,
+    max_delay: float = INDEXING_MAX_POLL_DELAY,
+):
+    """
+    Calls `check` with exponentially increasing delays until it returns a truthy value
+    or `timeout` seconds have passed.
+
+    Returns:
+        The last result of `check`.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        remaining = deadline - time.monotonic()
+        if result or remaining <= 0:
+            return result
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, max_delay)
+
+
+def wait_for_entries(archive, entry_ids, logger, *, timeout=INDEXING_TIMEOUT) -> bool:
+    """
+    Waits until the entries with the given entry ids are indexed, e.g. the entries of
+    archives that were just created with `create_archive`. The search index is polled
+    with backoff, so this only takes as long as the indexing.
+
+    Returns:
+        bool: Whether all entries were indexed before the timeout.
+    """
+    entry_ids = sorted(set(entry_ids))
+    if not entry_ids or isinstance(archive.m_context, ClientContext):
+        return True
+    from nomad.search import MetadataPagination, search
+
+    def all_indexed():
+        search_result = search(
+            owner='all',
+            query={'entry_id:any': entry_ids},
+            pagination=MetadataPagination(page_size=0),
+            user_id=archive.metadata.main_author.user_id,
+        )
+        return search_result.pagination.total >= len(entry_ids)
+
+    indexed = poll_until(all_indexed, timeout=timeout)
+    if not indexed:
+        logger.warning(
+            f'Not all of {len(entry_ids)} entries were indexed in {timeout} s.'
+        )
+    return indexed
+
+
+def index_by_lab_id(entries: list[dict]) -> dict[str, list[dict]]:
+    """
+    Indexes the entries of a search result by each of their lab_ids.
+
+    Returns:
+        dict[str, list[dict]]: The entries grouped by lab_id.
+    """
+    entries_by_lab_id = {}
+    for entry in entries:
+        lab_ids = entry.get('results', {}).get('eln', {}).get('lab_ids', [])
+        for lab_id in set(lab_ids):
+            entries_by_lab_id.setdefault(lab_id, []).append(entry)
+    return entries_by_lab_id
+
+
+def search_lab_ids(
+    archive,
+    query,
+    lab_ids,
+    logger,
+    *,
+    timeout=INDEXING_TIMEOUT,
+    settle_time=INDEXING_SETTLE_TIME,
+) -> dict[str, list[dict]]:
+    """
+    Searches the entries matching `query` that have one of the given lab_ids. Entries
+    that are processed at the same time might not be indexed yet, so the search is
+    repeated with backoff until an entry was found for every lab_id, no new entry was
+    found for `settle_time` seconds or the timeout is exceeded. A lab_id without any
+    entry, e.g. of a sample without a recipe, thus only delays the search by
+    `settle_time`.
+
+    Returns:
+        dict[str, list[dict]]: The search results grouped by lab_id.
+    """
+    lab_ids = sorted({str(lab_id) for lab_id in lab_ids})
+    search_results = {lab_id: [] for lab_id in lab_ids}
+    if not lab_ids or isinstance(archive.m_context, ClientContext):
+        return search_results
+    from nomad.search import search_iterator
+
+    found = 0
+    last_found = time.monotonic()
+
+    def search_all():
+        nonlocal found, last_found
+        for hits in search_results.values():
+            hits.clear()
+        for entry in search_iterator(
+            owner='all',
+            query={**query, 'results.eln.lab_ids:any': lab_ids},
+            user_id=archive.metadata.main_author.user_id,
+        ):
+            entry_lab_ids = entry.get('results', {}).get('eln', {}).get('lab_ids', [])
+            for lab_id in set(entry_lab_ids):
+                if lab_id in search_results:
+                    search_results[lab_id].append(entry)
+        hits = sum(len(entries) for entries in search_results.values())
+        if hits > found:
+            found, last_found = hits, time.monotonic()
+        return all(search_results.values()) or (
+            time.monotonic() - last_found >= settle_time
+        )
+
+    if not poll_until(search_all, timeout=timeout):
+        logger.warning(
+            f'No entries found for {sum(not hits for hits in search_results.values())} '
+            f'of {len(lab_ids)} lab_ids in {timeout} s.'
+        )
+    return search_results
+
+
 def nan_equal(a, b):
     """
-    Compare two values with NaN values.
+    Compare two values with NaN values. orjson writes NaN as null, so a NaN equals
+    None.
     """
     if isinstance(a, float) and isinstance(b, float):
         return a == b or (math.isnan(a) and math.isnan(b))
+    elif isinstance(a, float) and b is None:
+        return math.isnan(a)
+    elif a is None and isinstance(b, float):
+        return math.isnan(b)
     elif isinstance(a, dict) and isinstance(b, dict):
         return dict_nan_equal(a, b)
     elif isinstance(a, list) and isinstance(b, list):
@@ -77,6 +239,63 @@ def dict_nan_equal(dict1, dict2):
     return True
 
 
+def archive_file_type(filename: str) -> str:
+    """
+    Returns the file type of an archive file, `json` or `yaml`, from its extension.
+    """
+    return 'json' if filename.endswith('.json') else 'yaml'
+
+
+def serialize_archive(entry_dict, file_type) -> str:
+    """
+    Serializes an archive dict to the content of a `json` or `yaml` archive file.
+    YAML is written with the LibYAML dumper and JSON with orjson, if installed.
+    orjson writes NaN values as null, which is read back as None and compared equal to
+    NaN by `nan_equal`.
+    """
+    if file_type == 'json':
+        if orjson is not None:
+            return orjson.dumps(entry_dict, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        return json.dumps(entry_dict)
+    return yaml.dump(entry_dict, Dumper=YamlDumper)
+
+
+def deserialize_archive(content, file_type):
+    """
+    Reads the content of a `json` or `yaml` archive file to an archive dict with the
+    fastest available loader.
+    """
+    if file_type == 'json':
+        if orjson is not None:
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                # NaN values written by the json module are no valid JSON
+                pass
+        return json.loads(content)
+    return yaml.load(content, Loader=YamlLoader)
+
+
+def archive_content_equal(context, filename, content: str, file_type=None) -> bool:
+    """
+    Checks whether an existing archive file contains the same archive as `content`,
+    the serialized archive dict. The contents are compared as strings first, so
+    unchanged archives are detected without parsing the file. Only files that differ,
+    e.g. because they were written by another serializer, are parsed and compared with
+    the archive read back from `content` with `dict_nan_equal`.
+    """
+    if file_type is None:
+        file_type = archive_file_type(filename)
+    with context.raw_file(filename, 'r') as file:
+        existing_content = file.read()
+    if existing_content == content:
+        return True
+    return dict_nan_equal(
+        deserialize_archive(existing_content, file_type),
+        deserialize_archive(content, file_type),
+    )
+
+
 def create_archive(
     entry_dict, context, filename, file_type, logger, *, overwrite: bool = False
 ):
@@ -84,16 +303,12 @@ def create_archive(
     dicts_are_equal = None
     if isinstance(context, ClientContext):
         return None
+    content = serialize_archive(entry_dict, file_type)
     if file_exists:
-        with context.raw_file(filename, 'r') as file:
-            existing_dict = yaml.safe_load(file)
-            dicts_are_equal = dict_nan_equal(existing_dict, entry_dict)
+        dicts_are_equal = archive_content_equal(context, filename, content, file_type)
     if not file_exists or overwrite or dicts_are_equal:
         with context.raw_file(filename, 'w') as newfile:
-            if file_type == 'json':
-                json.dump(entry_dict, newfile)
-            elif file_type == 'yaml':
-                yaml.dump(entry_dict, newfile)
+            newfile.write(content)
         context.upload.process_updated_raw_file(filename, allow_modify=True)
     elif file_exists and not overwrite and not dicts_are_equal:
         logger.error(
@@ -104,6 +319,230 @@ def create_archive(
     return get_hash_ref(context.upload_id, filename)
 
 
+def min_max_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Selects the points to keep when downsampling a series for plotting.
+
+    The series is split into `(max_points - 2) // 2` buckets of consecutive points and
+    the indices of the minimum and maximum of each bucket are kept, so the envelope of
+    the series is preserved. The first and last point are always kept. NaN values are
+    ignored unless a bucket contains only NaN values.
+
+    Args:
+        values (np.ndarray): The values of the series.
+        max_points (int): The maximum number of points to keep, at least 4.
+
+    Returns:
+        np.ndarray: The sorted indices of the points to keep.
+    """
+    length = len(values)
+    if length <= max_points:
+        return np.arange(length)
+    bucket_size = -(-length // max((max_points - 2) // 2, 1))
+    bucket_count = -(-length // bucket_size)
+    buckets = np.full(bucket_count * bucket_size, np.nan)
+    buckets[:length] = values
+    buckets = buckets.reshape(bucket_count, bucket_size)
+    is_nan = np.isnan(buckets)
+    offsets = np.arange(bucket_count) * bucket_size
+    minima = np.argmin(np.where(is_nan, np.inf, buckets), axis=1) + offsets
+    maxima = np.argmax(np.where(is_nan, -np.inf, buckets), axis=1) + offsets
+    return np.unique(np.concatenate(([0, length - 1], minima, maxima)))
+
+
+class ColumnGroups:
+    """
+    Index of the repeated columns of a spreadsheet. pandas names the repetitions of a
+    header `<header>`, `<header>.1`, `<header>.2`, ... The index is built once per
+    DataFrame and maps a group of headers to the column positions of each repetition
+    that has all of them, so the values of a row are read by position.
+
+    Args:
+        dataframe (pd.DataFrame): The spreadsheet with the repeated columns.
+    """
+
+    def __init__(self, dataframe: pd.DataFrame):
+        self.positions = {
+            column: position for position, column in enumerate(dataframe.columns)
+        }
+        self.arrays = [
+            dataframe.iloc[:, position].to_numpy()
+            for position in range(len(dataframe.columns))
+        ]
+        self._groups = {}
+
+    def groups(self, headers: list[str]) -> list[tuple[int, ...]]:
+        """
+        Returns the column positions of the `headers` for each repetition, in the
+        order of the suffixes. The repetitions end with the first suffix for which one
+        of the headers is missing.
+        """
+        key = tuple(headers)
+        if key not in self._groups:
+            groups = []
+            while True:
+                suffix = f'.{len(groups)}' if groups else ''
+                positions = tuple(
+                    self.positions.get(f'{header}{suffix}') for header in headers
+                )
+                if None in positions:
+                    break
+                groups.append(positions)
+            self._groups[key] = groups
+        return self._groups[key]
+
+    def values(self, row: int, headers: list[str]) -> list[tuple]:
+        """
+        Returns the values of the `headers` in the row at position `row` for each
+        repetition.
+        """
+        return [
+            tuple(self.arrays[position][row] for position in positions)
+            for positions in self.groups(headers)
+        ]
+
+
+class ArchiveBatch:
+    """
+    Collects entities that are written to separate archive files in the upload.
+
+    The reference to the archive of an entity is returned as soon as it is added, so
+    the entities can reference each other before anything is written. Calling `write`
+    serializes and writes all archive files through a pool of `max_workers` threads and
+    only then triggers their processing in the order the entities were added. Like
+    `create_archive`, the archives are serialized with `serialize_archive`, existing
+    archive files are compared with `archive_content_equal` and nothing is written for
+    a `ClientContext`.
+    """
+
+    def __init__(self, archive, max_workers: int = 1):
+        self.archive = archive
+        self.max_workers = max_workers
+        self.entities = {}
+
+    def add(self, entity, file_name: str, *, overwrite: bool = False) -> str | None:
+        """
+        Adds an entity to be written to the archive file `file_name`.
+
+        Args:
+            entity (MSection | dict): The entity or its serialized form as returned by
+            `m_to_dict(with_root_def=True)`.
+            file_name (str): The name of the archive file.
+            overwrite (bool, optional): Whether an existing archive file with a
+            different content is overwritten, e.g. because the inputs the entity was
+            created from changed.
+
+        Returns:
+            str | None: The reference to the data section of the archive.
+        """
+        reference = self.reference(file_name)
+        if reference is not None:
+            self.entities[file_name] = (entity, overwrite)
+        return reference
+
+    def reference(self, file_name: str) -> str | None:
+        """
+        Returns the reference to the data section of the archive file `file_name`
+        without adding an entity for it.
+        """
+        if isinstance(self.archive.m_context, ClientContext):
+            return None
+        return get_hash_ref(self.archive.metadata.upload_id, file_name)
+
+    def _write_file(self, file_name: str) -> str:
+        context = self.archive.m_context
+        entity, overwrite = self.entities[file_name]
+        if isinstance(entity, dict):
+            entity_dict = entity
+        else:
+            entity_dict = entity.m_to_dict(with_root_def=True)
+        file_type = archive_file_type(file_name)
+        content = serialize_archive({'data': entity_dict}, file_type)
+        file_exists = context.raw_path_exists(file_name)
+        if file_exists and archive_content_equal(
+            context, file_name, content, file_type
+        ):
+            return 'unchanged'
+        if file_exists and not overwrite:
+            return 'modified'
+        with context.raw_file(file_name, 'w') as outfile:
+            outfile.write(content)
+        return 'overwritten' if file_exists else 'written'
+
+    def write(self, logger=None) -> list[str]:
+        """
+        Writes and processes the archive files of all added entities that do not exist
+        yet or were added with `overwrite` and have a different content. Other existing
+        archive files with a different content are left untouched and reported through
+        the logger.
+
+        Args:
+            logger (BoundLogger, optional): A structlog logger for progress reports.
+
+        Returns:
+            list[str]: The names of the archive files that were written.
+        """
+        file_names = list(self.entities)
+        if self.max_workers > 1 and len(file_names) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self._write_file, file_names))
+        else:
+            results = [self._write_file(file_name) for file_name in file_names]
+        results = dict(zip(file_names, results))
+        written_files = [
+            file_name
+            for file_name, result in results.items()
+            if result in ('written', 'overwritten')
+        ]
+        for file_name in written_files:
+            self.archive.m_context.process_updated_raw_file(
+                file_name, allow_modify=results[file_name] == 'overwritten'
+            )
+        if logger is not None and file_names:
+            unchanged = list(results.values()).count('unchanged')
+            logger.info(
+                f'Wrote {len(written_files)} of {len(file_names)} archives, '
+                f'{unchanged} already existed with identical content.'
+            )
+            for file_name, result in results.items():
+                if result == 'modified':
+                    logger.warning(
+                        f'{file_name} archive file already exists with a different '
+                        'content. To recreate it, remove the existing archive and '
+                        'click reprocess again.'
+                    )
+        self.entities = {}
+        return written_files
+
+
+def open_excel(path) -> pd.ExcelFile:
+    """
+    Opens an Excel file to read its sheets with `read_excel_sheet`. The workbook is
+    read with the calamine engine if `python-calamine` is installed and with openpyxl
+    in read-only mode otherwise.
+    """
+    return pd.ExcelFile(path, engine=EXCEL_ENGINE)
+
+
+def read_excel_sheet(excel_file, sheet_name=0, columns=None, **kwargs) -> pd.DataFrame:
+    """
+    Reads a sheet of an Excel file opened with `open_excel`.
+
+    Args:
+        excel_file (pd.ExcelFile): The Excel file.
+        sheet_name (str | int, optional): The name or position of the sheet.
+        columns (Iterable[str], optional): The headers of the columns to read. The other
+            columns of the sheet are skipped. Defaults to reading all columns.
+        **kwargs: Further arguments of `pd.read_excel`.
+
+    Returns:
+        pd.DataFrame: The sheet.
+    """
+    if columns is not None:
+        kwargs['usecols'] = set(columns).__contains__
+    return pd.read_excel(excel_file, sheet_name, **kwargs)
+
+
 def df_value(dataframe, column_header, index=None):
     """
     Fetches a value from a DataFrame.
@@ -115,11 +554,11 @@ def df_value(dataframe, column_header, index=None):
     return None
 
 
-def typed_df_value(dataframe, column_header, value_type, index=None):
+def typed_value(value, value_type):
     """
-    Fetches a value of a specified type from a DataFrame.
+    Returns the value if it is of the specified type, None otherwise. For `str` the
+    string representation of the value is returned.
     """
-    value = df_value(dataframe, column_header, index)
     if value_type is str:
         return str(value)
     if isinstance(value, value_type):
@@ -127,6 +566,27 @@ def typed_df_value(dataframe, column_header, value_type, index=None):
     return None
 
 
+def typed_df_value(dataframe, column_header, value_type, index=None):
+    """
+    Fetches a value of a specified type from a DataFrame.
+    """
+    return typed_value(df_value(dataframe, column_header, index), value_type)
+
+
+def dataframe_records(dataframe: pd.DataFrame) -> list[dict]:
+    """
+    Converts a DataFrame to a list of records, one dict per row mapping the column
+    headers to the values. The columns are converted to arrays once and, unlike
+    `DataFrame.to_dict('records')`, the values keep the numpy type of their column
+    as with `dataframe[column_header][index]`.
+    """
+    arrays = [
+        dataframe.iloc[:, position].to_numpy()
+        for position in range(len(dataframe.columns))
+    ]
+    return [dict(zip(dataframe.columns, row)) for row in zip(*arrays)]
+
+
 def row_to_array(dataframe: pd.DataFrame, quantity: str, row_index: int) -> pd.Series:
     """
     Extracts values from a DataFrame row across multiple columns with similar names.
@@ -0,0 +1,168 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Generator of synthetic `.elog`/`.dlog` pairs of the IKZ PLD for benchmarking.
+
+The logs follow the format of the logs in `tests/data/pld`: the recipe log lists a
+heat, dwell, deposition and cool recipe for each layer and the data log contains the
+process data sampled at a constant rate over the whole process. The logs can also be
+generated from the command line:
+
+    python tests/benchmarks/pld_logs.py <rows> <steps> <directory>
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+PLD_TARGETS = ['SAO', 'STO', 'LAO']
+PLD_RECIPES = ['heat', 'dwell', 'depo', 'cool']
+PLD_DLOG_CHUNK_ROWS = 100_000
+
+
+def format_time(seconds: int) -> str:
+    """
+    Formats a process time in seconds like the PLD software as %h:%m:%s without
+    padding.
+    """
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f'{hours}:{minutes}:{seconds}'
+
+
+def pld_recipe(steps: int) -> list[tuple[str, int, float]]:
+    """
+    Creates a recipe with `steps` steps cycling through the recipes of `PLD_RECIPES`
+    and the targets of `PLD_TARGETS`.
+
+    Returns:
+        list[tuple[str, int, float]]: The recipe name, the number of laser pulses and
+        the set temperature in °C of each step.
+    """
+    recipe = []
+    for index in range(steps):
+        step = PLD_RECIPES[index % len(PLD_RECIPES)]
+        target = PLD_TARGETS[index // len(PLD_RECIPES) % len(PLD_TARGETS)]
+        temperature = 20 if step == 'cool' else 700
+        pulses = 300 + 10 * (index % 7) if step == 'depo' else 0
+        recipe.append((f'{step}{target}{temperature}', pulses, temperature))
+    return recipe
+
+
+def write_pld_logs(
+    directory: str,
+    rows: int,
+    steps: int,
+    seed: int = 0,
+    name: str = '01012024_1200-synthetic',
+) -> tuple[str, str]:
+    """
+    Writes a synthetic pair of PLD logs.
+
+    Args:
+        directory (str): The directory to write the logs to.
+        rows (int): The number of rows of the data log.
+        steps (int): The number of steps of the recipe log.
+        seed (int, optional): The seed of the random noise in the data log.
+        name (str, optional): The name of the logs following the
+            `<%d%m%Y_%H%M>-<name>` pattern of the PLD software.
+
+    Returns:
+        tuple[str, str]: The file names of the recipe log and the data log.
+    """
+    recipe = pld_recipe(steps)
+    sample_interval_s = 2.0
+    evacuation_s = 600
+    pause_s = 16
+    step_s = max(int(rows * sample_interval_s / steps) - pause_s, 1)
+    elog = f'{name}.elog'
+    dlog = f'{name}.dlog'
+
+    starts = evacuation_s + np.arange(steps) * (step_s + pause_s)
+    with open(os.path.join(directory, elog), 'w') as file:
+        file.write(f'{format_time(14)}\tStarting Evacuation Recipe\n')
+        for start, (recipe_name, pulses, _) in zip(starts, recipe):
+            end = format_time(start + step_s)
+            file.write(
+                f'{format_time(start)}\tStarting Process with Recipe :{recipe_name}\n'
+                f'{end}\t{pulses} Laser-pulse fired on target\n'
+                f'{end}\tEvent completed\n'
+            )
+        file.write(f'{format_time(starts[-1] + step_s)}\tShutting down system\n')
+
+    # The parameters of the step that is running at each of the rows
+    step_end_s = starts + step_s
+    set_temperature = np.array([temperature for _, _, temperature in recipe], float)
+    frequency = np.array([5.0 if pulses > 0 else 0.0 for _, pulses, _ in recipe])
+    rng = np.random.default_rng(seed)
+    with open(os.path.join(directory, dlog), 'w') as file:
+        for offset in range(0, rows, PLD_DLOG_CHUNK_ROWS):
+            index = np.arange(offset, min(offset + PLD_DLOG_CHUNK_ROWS, rows))
+            time_s = evacuation_s + index * sample_interval_s
+            step = np.clip(np.searchsorted(step_end_s, time_s), 0, steps - 1)
+            noise = rng.normal(size=(5, len(index)))
+            temperature = set_temperature[step] + 0.5 * noise[0]
+            pressure = 1e-1 * 10 ** (0.05 * noise[1])
+            o2_flow = 4.6 + 0.02 * noise[2]
+            laser_energy = np.where(frequency[step] > 0, 200 + 2 * noise[3], 0.0)
+            data = np.column_stack(
+                [
+                    time_s,
+                    temperature,
+                    pressure,
+                    o2_flow,
+                    np.zeros(len(index)),
+                    frequency[step],
+                    laser_energy,
+                    pressure * (1 + 0.01 * noise[4]),
+                    np.zeros(len(index)),
+                ]
+            )
+            np.savetxt(file, data, fmt='%.3E', delimiter='\t')
+    return elog, dlog
+
+
+def write_pld_archive(directory: str, elog: str, dlog: str) -> str:
+    """
+    Writes an archive of an `IKZPulsedLaserDeposition` using the logs.
+
+    Returns:
+        str: The path of the archive file.
+    """
+    file_path = os.path.join(directory, f'{dlog.rsplit(".", 1)[0]}.archive.yaml')
+    with open(file_path, 'w') as file:
+        file.write(
+            'data:\n'
+            '  m_def: nomad_ikz_plugin.pld.schema.IKZPulsedLaserDeposition\n'
+            f'  data_log: {dlog}\n'
+            f'  recipe_log: {elog}\n'
+        )
+    return file_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('rows', type=int, help='The number of rows of the data log.')
+    parser.add_argument('steps', type=int, help='The number of recipe steps.')
+    parser.add_argument('directory', help='The directory to write the logs to.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+    elog, dlog = write_pld_logs(args.directory, args.rows, args.steps, args.seed)
+    write_pld_archive(args.directory, elog, dlog)
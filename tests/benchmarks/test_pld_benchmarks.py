@@ -0,0 +1,174 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""
+Benchmarks of the hot path of `IKZPulsedLaserDeposition` on synthetic logs.
+
+The benchmarks are not collected by the default test run and are run by passing their
+directory explicitly:
+
+    pytest tests/benchmarks
+
+The logs are generated with `pld_logs.py` for each of the `PLD_BENCHMARK_SIZES`. Sizes
+with more rows than the `PLD_BENCHMARK_MAX_ROWS` environment variable (default
+100 000) are skipped. A run can be saved as a local baseline with
+`--benchmark-save=<name>` and later runs compared against it with:
+
+    pytest tests/benchmarks --benchmark-compare=0001 --benchmark-compare-fail=mean:25%
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from nomad.client import parse  # noqa: E402
+from nomad.utils import get_logger  # noqa: E402
+from pld_logs import write_pld_archive, write_pld_logs  # noqa: E402
+
+from nomad_ikz_plugin.pld.schema import (  # noqa: E402
+    PLD_CACHE_SUFFIX,
+    elog_steps,
+    read_pld_logs,
+)
+
+PLD_BENCHMARK_SIZES = [
+    (10_000, 5),
+    (100_000, 50),
+    (1_000_000, 200),
+    (10_000_000, 500),
+]
+PLD_BENCHMARK_MAX_ROWS = int(os.environ.get('PLD_BENCHMARK_MAX_ROWS', '100000'))
+
+logger = get_logger(__name__)
+
+
+@pytest.fixture(
+    name='pld_archive_path',
+    scope='module',
+    params=[
+        pytest.param(
+            size,
+            id=f'{size[0]}rows-{size[1]}steps',
+            marks=pytest.mark.skipif(
+                size[0] > PLD_BENCHMARK_MAX_ROWS,
+                reason='Set PLD_BENCHMARK_MAX_ROWS to run the larger benchmarks.',
+            ),
+        )
+        for size in PLD_BENCHMARK_SIZES
+    ],
+)
+def fixture_pld_archive_path(request, tmp_path_factory):
+    """
+    Generates the synthetic logs and the archive of the PLD process using them.
+    """
+    rows, steps = request.param
+    directory = str(tmp_path_factory.mktemp(f'pld-{rows}-{steps}'))
+    elog, dlog = write_pld_logs(directory, rows, steps)
+    return write_pld_archive(directory, elog, dlog)
+
+
+@pytest.fixture(name='normalized_pld_archive', scope='module')
+def fixture_normalized_pld_archive(pld_archive_path):
+    """
+    Parses and normalizes the archive of the PLD process.
+    """
+    archive = parse(pld_archive_path)[0]
+    archive.data.normalize(archive, logger)
+    return archive
+
+
+def test_read_pld_logs(benchmark, pld_archive_path):
+    """
+    Benchmarks parsing the logs without the cache.
+    """
+    archive = parse(pld_archive_path)[0]
+    cache_file = os.path.join(
+        os.path.dirname(pld_archive_path),
+        f'{archive.data.data_log}{PLD_CACHE_SUFFIX}',
+    )
+
+    def setup():
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+        return (archive, archive.data.recipe_log, archive.data.data_log, logger), {}
+
+    _, df_data = benchmark.pedantic(read_pld_logs, setup=setup, rounds=3)
+    assert len(df_data) > 0
+
+
+def test_read_pld_logs_cached(benchmark, pld_archive_path):
+    """
+    Benchmarks loading the parsed logs from the cache.
+    """
+    archive = parse(pld_archive_path)[0]
+    args = (archive, archive.data.recipe_log, archive.data.data_log, logger)
+    read_pld_logs(*args)
+    _, df_data = benchmark(read_pld_logs, *args)
+    assert len(df_data) > 0
+
+
+def test_elog_steps(benchmark, pld_archive_path):
+    """
+    Benchmarks extracting the steps from the recipe log.
+    """
+    archive = parse(pld_archive_path)[0]
+    df_recipe, _ = read_pld_logs(
+        archive, archive.data.recipe_log, archive.data.data_log, logger
+    )
+    df_steps, _ = benchmark(elog_steps, df_recipe)
+    assert len(df_steps) > 0
+
+
+def test_normalize(benchmark, pld_archive_path):
+    """
+    Benchmarks building the steps and the plot from the cached logs.
+    """
+
+    def setup():
+        archive = parse(pld_archive_path)[0]
+        return (archive, logger), {}
+
+    def normalize(archive, logger):
+        archive.data.normalize(archive, logger)
+        return archive
+
+    archive = benchmark.pedantic(normalize, setup=setup, rounds=3)
+    assert len(archive.data.steps) > 0
+
+
+def test_plot(benchmark, normalized_pld_archive):
+    """
+    Benchmarks plotting the time series stored in the steps.
+    """
+    process = normalized_pld_archive.data
+
+    def setup():
+        process.figures = []
+        return (), {}
+
+    benchmark.pedantic(process.plot, setup=setup, rounds=5)
+    assert len(process.figures) == 1
+
+
+def test_serialize(benchmark, normalized_pld_archive):
+    """
+    Benchmarks serializing the normalized archive.
+    """
+    archive_dict = benchmark(normalized_pld_archive.m_to_dict)
+    assert len(archive_dict['data']['steps']) > 0
@@ -17,16 +17,28 @@
 #
 import logging
 import os
+from contextlib import contextmanager
+from types import SimpleNamespace
 
 import pytest
 import structlog
 from nomad.client import parse
+from nomad.config import config
 from nomad.utils import structlogging
 from structlog.testing import LogCapture
 
+from nomad_ikz_plugin import directional_solidification
+
 structlogging.ConsoleFormatter.short_format = True
 setattr(logging, 'Formatter', structlogging.ConsoleFormatter)
 
+# the entry points are kept before importing the `schema` module replaces the
+# attribute of the same name
+DIRECTIONAL_SOLIDIFICATION_ENTRY_POINTS = {
+    name: getattr(directional_solidification, name)
+    for name in ['schema', 'manual_protocol_parser', 'digital_protocol_parser']
+}
+
 
 @pytest.fixture(
     name='caplog',
@@ -95,3 +107,65 @@ def fixture_parsed_json_archive(request):
     file_archive = parse(rel_file_path)[0]
 
     yield file_archive
+
+
+class UploadContext:
+    """
+    A minimal context of an upload with the raw files in a directory. Like the
+    `ServerContext`, updated raw files are processed with
+    `context.process_updated_raw_file` or `context.upload.process_updated_raw_file`,
+    which record the calls in `processed`.
+    """
+
+    upload_id = 'test_upload'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.processed = []
+        self.upload = SimpleNamespace(
+            process_updated_raw_file=self.process_updated_raw_file
+        )
+
+    def raw_path_exists(self, file_name):
+        return os.path.exists(os.path.join(self.directory, file_name))
+
+    @contextmanager
+    def raw_file(self, file_name, mode='r'):
+        with open(os.path.join(self.directory, file_name), mode) as file:
+            yield file
+
+    def process_updated_raw_file(self, file_name, allow_modify=False):
+        self.processed.append((file_name, allow_modify))
+
+
+@pytest.fixture(
+    name='upload_context',
+    scope='function',
+)
+def fixture_upload_context():
+    """
+    Returns a function creating an `UploadContext` of the raw files in a directory.
+    """
+    return UploadContext
+
+
+@pytest.fixture(
+    name='directional_solidification_entry_points',
+    scope='function',
+)
+def fixture_directional_solidification_entry_points(monkeypatch):
+    """
+    Registers copies of the directional solidification entry points, which are not
+    registered in pyproject.toml, for the duration of the test. Returns the copies by
+    their name, so that a test can change their configuration.
+    """
+    config.load_plugins()
+    entry_points = {}
+    for name, entry_point in DIRECTIONAL_SOLIDIFICATION_ENTRY_POINTS.items():
+        entry_points[name] = entry_point.model_copy(deep=True)
+        monkeypatch.setitem(
+            config.plugins.entry_points.options,
+            f'nomad_ikz_plugin.directional_solidification:{name}',
+            entry_points[name],
+        )
+    return entry_points
@@ -0,0 +1,468 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import importlib
+import io
+import os
+
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+from nomad.config import config
+from nomad.datamodel import EntryArchive
+from nomad.utils import get_logger
+
+TIME_FORMAT = '%d.%m.%Y %H:%M:%S'
+CHANNELS = ['T Ist H1', 'P Ist H1', 'T12', 'CO-Messwert [Vol/%]']
+PROTOCOL_ROWS = 1200
+PROTOCOL_PERIOD_S = 10
+
+
+def protocol_lines() -> list[bytes]:
+    """
+    Returns the lines of a synthetic digital protocol csv with a row every 10 s from
+    02:00 CEST on the day daylight saving time ends, so the hour from 02:00 to 03:00
+    is repeated. The power is integer in the first half and float in the second one
+    and the temperature has missing values.
+    """
+    time = (
+        pd.date_range(
+            '2024-10-27 00:00:00',
+            periods=PROTOCOL_ROWS,
+            freq=f'{PROTOCOL_PERIOD_S}s',
+            tz='UTC',
+        )
+        .tz_convert('Europe/Berlin')
+        .strftime(TIME_FORMAT)
+    )
+    rng = np.random.default_rng(0)
+    columns = {}
+    for channel in CHANNELS:
+        values = np.round(rng.normal(1000, 5, PROTOCOL_ROWS), 1)
+        if channel == 'T Ist H1':
+            values[rng.random(PROTOCOL_ROWS) < 0.05] = np.nan
+        columns[f'{channel} Time'] = time
+        columns[f'{channel} ValueY'] = values
+    power = columns['P Ist H1 ValueY'].astype(str).astype(object)
+    power[: PROTOCOL_ROWS // 2] = np.arange(PROTOCOL_ROWS // 2).astype(str)
+    power[PROTOCOL_ROWS // 2 :] = [
+        value.replace('.', ',') for value in power[PROTOCOL_ROWS // 2 :]
+    ]
+    columns['P Ist H1 ValueY'] = power
+    content = pd.DataFrame(columns).to_csv(sep=';', decimal=',', index=False)
+    return content.encode().splitlines(keepends=True)
+
+
+@pytest.fixture(name='parser')
+def fixture_parser(directional_solidification_entry_points):
+    """
+    Returns the directional solidification parser module, which looks up the
+    registered entry points.
+    """
+    return importlib.import_module('nomad_ikz_plugin.directional_solidification.parser')
+
+
+@pytest.fixture(name='configuration')
+def fixture_configuration(directional_solidification_entry_points):
+    """
+    Returns the registered entry point of the digital protocol parser, whose
+    configuration a test can change.
+    """
+    return directional_solidification_entry_points['digital_protocol_parser']
+
+
+def parse_protocol(parser, upload_context, directory, lines: list[bytes]):
+    """
+    Writes the lines to the digital protocol csv in the directory and parses it.
+    Returns the path of the HDF5 file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    mainfile = directory / 'protocol.csv'
+    mainfile.write_bytes(b''.join(lines))
+    archive = EntryArchive(m_context=upload_context(directory))
+    parser.DSDigitalProtocolParserIKZ().parse(
+        str(mainfile), archive, get_logger(__name__)
+    )
+    return directory / 'protocol.h5'
+
+
+def assert_hdf5_equal(path, expected_path):
+    """
+    Asserts that two HDF5 files have the same groups, datasets and attributes.
+    """
+    with h5py.File(path) as hdf, h5py.File(expected_path) as expected:
+        names, expected_names = [], []
+        hdf.visit(names.append)
+        expected.visit(expected_names.append)
+        assert names == expected_names
+        for name in ['/', *names]:
+            obj, expected_obj = hdf[name], expected[name]
+            assert obj.attrs.keys() == expected_obj.attrs.keys(), name
+            for key, value in obj.attrs.items():
+                np.testing.assert_array_equal(value, expected_obj.attrs[key])
+            if isinstance(obj, h5py.Dataset):
+                assert obj.dtype == expected_obj.dtype, name
+                np.testing.assert_array_equal(obj[()], expected_obj[()], name)
+
+
+def test_manual_protocol_parser_entry_point(
+    directional_solidification_entry_points, monkeypatch
+):
+    """
+    Tests that the manual protocol parser is loaded without the entry point of the
+    digital protocol parser.
+    """
+    monkeypatch.delitem(
+        config.plugins.entry_points.options,
+        'nomad_ikz_plugin.directional_solidification:digital_protocol_parser',
+    )
+    importlib.reload(
+        importlib.import_module('nomad_ikz_plugin.directional_solidification.parser')
+    )
+    parser = directional_solidification_entry_points['manual_protocol_parser'].load()
+    assert type(parser).__name__ == 'DSManualProtocolParserIKZ'
+
+
+def test_read_digital_protocol(parser):
+    """
+    Tests that only the first time column is read and that the slashes in the channel
+    names are replaced.
+    """
+    lines = protocol_lines()
+    chunks = list(parser.read_digital_protocol(io.BytesIO(b''.join(lines)), 500))
+    assert [len(chunk) for chunk in chunks] == [500, 500, 200]
+    assert chunks[0].columns.tolist() == [
+        'T Ist H1 Time',
+        'T Ist H1 ValueY',
+        'P Ist H1 ValueY',
+        'T12 ValueY',
+        'CO-Messwert [Vol %] ValueY',
+    ]
+    assert chunks[0]['T12 ValueY'].dtype == np.float64
+
+    # the rows after the header are read with the given names
+    file = io.BytesIO(b''.join(lines))
+    file.readline()
+    names = pd.read_csv(io.BytesIO(lines[0]), sep=';').columns.tolist()
+    chunks_without_header = list(parser.read_digital_protocol(file, 500, names))
+    for chunk, chunk_without_header in zip(chunks, chunks_without_header):
+        pd.testing.assert_frame_equal(chunk, chunk_without_header)
+
+
+def test_protocol_clock_dst(parser):
+    """
+    Tests that the elapsed time stays continuous in the hour repeated at the end of
+    daylight saving time, also if the protocol is converted in chunks splitting it.
+    """
+    time_column = pd.read_csv(
+        io.BytesIO(b''.join(protocol_lines())), sep=';', usecols=['T Ist H1 Time']
+    )['T Ist H1 Time']
+    expected = np.arange(PROTOCOL_ROWS) * float(PROTOCOL_PERIOD_S)
+    assert np.array_equal(parser.ProtocolClock().elapsed_seconds(time_column), expected)
+    # the clock steps back after 02:59:50 CEST at row 360
+    for split in [1, 359, 360, 361, 500, 719, 720, 721]:
+        clock = parser.ProtocolClock()
+        elapsed = np.concatenate(
+            [
+                clock.elapsed_seconds(time_column[:split]),
+                clock.elapsed_seconds(time_column[split:]),
+            ]
+        )
+        assert np.array_equal(elapsed, expected), split
+
+
+def test_protocol_clock_sparse(parser):
+    """
+    Tests that a gap of less than an hour after the clock stepped back is converted
+    to standard time and that the clock state carries over between chunks.
+    """
+    time_column = pd.Series(
+        ['27.10.2024 02:50:00', '27.10.2024 02:10:00', '27.10.2024 03:05:00']
+    )
+    assert parser.ProtocolClock().elapsed_seconds(time_column).tolist() == [
+        0.0,
+        1200.0,
+        4500.0,
+    ]
+    clock = parser.ProtocolClock()
+    clock.elapsed_seconds(time_column[:1])
+    assert clock.elapsed_seconds(time_column[1:]).tolist() == [1200.0, 4500.0]
+    assert clock.elapsed_seconds(time_column[:0]).tolist() == []
+
+
+def test_channel_dataset(parser, configuration):
+    """
+    Tests that float channels are only downcast to float32 if this keeps them within
+    half their resolution and that non-numeric channels are not compressed.
+    """
+    values = np.round(np.random.default_rng(0).normal(1000, 5, 100), 1)
+    options = parser.channel_dataset(values, configuration)
+    assert options['data'].dtype == np.float64
+    assert options['chunks'] == (configuration.hdf5_chunk_rows,)
+    assert options['maxshape'] == (None,)
+    assert options['compression'] == configuration.hdf5_compression
+
+    options = parser.channel_dataset(values, configuration, resolution=0.1)
+    assert options['data'].dtype == np.float32
+    assert np.array_equal(np.round(options['data'].astype(np.float64), 1), values)
+    assert (
+        parser.channel_dataset(values, configuration, resolution=1e-6)['data'].dtype
+        == np.float64
+    )
+    assert (
+        parser.channel_dataset(np.arange(100), configuration, resolution=0.1)[
+            'data'
+        ].dtype
+        == np.int64
+    )
+
+    options = parser.channel_dataset(
+        np.array(['on', 'off'], dtype=object), configuration
+    )
+    assert 'compression' not in options
+
+
+def test_append_channel(tmp_path, parser, configuration):
+    """
+    Tests that a channel is rewritten with the common type when a chunk needs a wider
+    type than the previous ones.
+    """
+    chunks = [np.arange(5), np.arange(5, 10), np.array([10.5, np.nan]), np.arange(3)]
+    with h5py.File(tmp_path / 'test.h5', 'w') as hdf:
+        group = hdf.create_group('channel')
+        for chunk in chunks:
+            dataset = parser.append_channel(group, 'value', chunk, configuration)
+        assert dataset.dtype == np.float64
+        assert dataset.chunks == (configuration.hdf5_chunk_rows,)
+        assert dataset.maxshape == (None,)
+        np.testing.assert_array_equal(dataset[()], np.concatenate(chunks))
+
+
+def test_streaming_conversion(tmp_path, parser, upload_context, configuration):
+    """
+    Tests that converting the protocol in chunks of rows writes the same HDF5 file as
+    converting it at once, with the values of the csv.
+    """
+    lines = protocol_lines()
+    configuration.csv_chunk_rows = PROTOCOL_ROWS
+    expected_path = parse_protocol(parser, upload_context, tmp_path / 'single', lines)
+    configuration.csv_chunk_rows = 70
+    path = parse_protocol(parser, upload_context, tmp_path / 'chunks', lines)
+    assert_hdf5_equal(path, expected_path)
+
+    df_csv = pd.read_csv(io.BytesIO(b''.join(lines)), sep=';', decimal=',')
+    with h5py.File(path) as hdf:
+        assert hdf.attrs['csv_rows'] == PROTOCOL_ROWS
+        np.testing.assert_array_equal(
+            hdf['all_parameters/time'][()],
+            np.arange(PROTOCOL_ROWS) * float(PROTOCOL_PERIOD_S),
+        )
+        for group_name, channel in [
+            ('t_ist_h1', 'T Ist H1'),
+            ('p_ist_h1', 'P Ist H1'),
+            ('t12', 'T12'),
+            ('co-messwert_[vol_%]', 'CO-Messwert [Vol/%]'),
+        ]:
+            group = hdf[f'all_parameters/{group_name}']
+            assert group['value'].dtype == np.float64
+            np.testing.assert_array_equal(
+                group['value'][()], df_csv[f'{channel} ValueY'].to_numpy()
+            )
+            assert group['time'] == hdf['all_parameters/time']
+        assert hdf['heater_1/t_ist_h1'] == hdf['all_parameters/t_ist_h1/value']
+
+
+def test_file_range(parser):
+    """
+    Tests that the range is read from the current position of the file up to its end
+    and that the bytes read are hashed.
+    """
+    file = io.BytesIO(b'0123456789')
+    file.seek(2)
+    sha256 = hashlib.sha256(b'01')
+    assert io.BufferedReader(parser.FileRange(file, 7, sha256)).read() == b'23456'
+    assert sha256.hexdigest() == hashlib.sha256(b'0123456').hexdigest()
+
+
+def converted_progress(parser, directory, lines: list[bytes]):
+    """
+    Writes the lines to the digital protocol csv in the directory and returns the
+    progress of its HDF5 file that is kept when the csv is parsed again.
+    """
+    mainfile = directory / 'protocol.csv'
+    mainfile.write_bytes(b''.join(lines))
+    with h5py.File(directory / 'protocol.h5') as hdf:
+        return parser.ProtocolProgress.from_hdf5(hdf, str(mainfile))
+
+
+def test_incremental_append(tmp_path, parser, upload_context, configuration):
+    """
+    Tests that appending the rows of a growing csv writes the same HDF5 file as
+    converting the complete csv, also if the csv grows in the hour repeated at the
+    end of daylight saving time and ends with an incomplete line.
+    """
+    configuration.csv_chunk_rows = 70
+    lines = protocol_lines()
+    expected_path = parse_protocol(parser, upload_context, tmp_path / 'full', lines)
+
+    directory = tmp_path / 'incremental'
+    path = parse_protocol(
+        parser, upload_context, directory, [*lines[:301], lines[301][:15]]
+    )
+    for rows in [400, 400, PROTOCOL_ROWS]:
+        with h5py.File(path) as hdf:
+            converted_rows = hdf.attrs['csv_rows']
+        assert (
+            converted_progress(parser, directory, lines[: rows + 1]).rows
+            == converted_rows
+        )
+        parse_protocol(parser, upload_context, directory, lines[: rows + 1])
+        with h5py.File(path) as hdf:
+            assert hdf.attrs['csv_rows'] == rows
+            np.testing.assert_array_equal(
+                hdf['all_parameters/time'][()],
+                np.arange(rows) * float(PROTOCOL_PERIOD_S),
+            )
+    assert converted_rows == 400
+    assert_hdf5_equal(path, expected_path)
+
+
+def test_missing_trailing_line_break(tmp_path, parser, upload_context, configuration):
+    """
+    Tests that the last line of a csv without a trailing line break is converted if it
+    has all columns and that the rows appended after it are converted as well.
+    """
+    configuration.csv_chunk_rows = 70
+    lines = protocol_lines()
+    expected_path = parse_protocol(parser, upload_context, tmp_path / 'full', lines)
+
+    directory = tmp_path / 'incremental'
+    truncated_line = lines[401][: lines[401].rindex(b';')]
+    for changed_lines in [
+        [*lines[:400], lines[400].rstrip(b'\n')],
+        [*lines[:401], truncated_line],
+    ]:
+        path = parse_protocol(parser, upload_context, directory, changed_lines)
+        df_csv = pd.read_csv(io.BytesIO(b''.join(lines[:401])), sep=';', decimal=',')
+        with h5py.File(path) as hdf:
+            assert hdf.attrs['csv_rows'] == 400
+            np.testing.assert_array_equal(
+                hdf['all_parameters/t12/value'][()], df_csv['T12 ValueY']
+            )
+    parse_protocol(parser, upload_context, directory, lines)
+    assert_hdf5_equal(path, expected_path)
+
+
+def test_rebuild(tmp_path, parser, upload_context, configuration):
+    """
+    Tests that the HDF5 file is rebuilt if the converted part of the csv was modified
+    or the csv shrank.
+    """
+    configuration.csv_chunk_rows = 70
+    lines = protocol_lines()
+    modified_lines = lines.copy()
+    modified_lines[5] = modified_lines[5].replace(b';', b';1', 2)
+    assert modified_lines[5] != lines[5]
+    for changed_lines in [modified_lines, lines[:501]]:
+        directory = tmp_path / str(len(changed_lines))
+        path = parse_protocol(parser, upload_context, directory, lines)
+        assert converted_progress(parser, directory, changed_lines) is None
+        parse_protocol(parser, upload_context, directory, changed_lines)
+        expected_path = parse_protocol(
+            parser, upload_context, tmp_path / 'expected', changed_lines
+        )
+        assert_hdf5_equal(path, expected_path)
+        os.remove(expected_path)
+
+
+def test_bucket_statistics(parser):
+    """
+    Tests that the min, max and mean of the buckets ignore NaN values, also for a
+    shorter last bucket and a bucket with only NaN values.
+    """
+    values = np.random.default_rng(0).normal(size=95)
+    values[[3, 17, 94]] = np.nan
+    values[20:30] = np.nan
+    expected = (
+        pd.Series(values).groupby(np.arange(95) // 10).agg(['min', 'max', 'mean'])
+    )
+    statistics = parser.bucket_statistics(values, 10)
+    for statistic in ['min', 'max']:
+        np.testing.assert_array_equal(statistics[statistic], expected[statistic])
+    np.testing.assert_allclose(statistics['mean'], expected['mean'], rtol=1e-12)
+
+    statistics = parser.bucket_statistics(np.arange(25), 10)
+    assert statistics['min'].tolist() == [0, 10, 20]
+    assert statistics['max'].tolist() == [9, 19, 24]
+    assert statistics['mean'].tolist() == [4.5, 14.5, 22.0]
+
+
+def test_pyramid(tmp_path, parser, upload_context, configuration):
+    """
+    Tests that the min/max/mean pyramid matches the statistics of the values of the
+    csv and that channels with a configured resolution are stored as float32.
+    """
+    configuration.csv_chunk_rows = 70
+    configuration.hdf5_pyramid_levels = [10, 100]
+    configuration.hdf5_float32_resolution = {'t12': 0.1}
+    lines = protocol_lines()
+    path = parse_protocol(parser, upload_context, tmp_path, lines)
+
+    df_csv = pd.read_csv(io.BytesIO(b''.join(lines)), sep=';', decimal=',')
+    time = np.arange(PROTOCOL_ROWS) * float(PROTOCOL_PERIOD_S)
+    with h5py.File(path) as hdf:
+        assert hdf['all_parameters/t12/value'].dtype == np.float32
+        np.testing.assert_array_equal(
+            np.round(hdf['all_parameters/t12/value'][()].astype(np.float64), 1),
+            df_csv['T12 ValueY'],
+        )
+        for level in [10, 100]:
+            buckets = np.arange(PROTOCOL_ROWS) // level
+            np.testing.assert_allclose(
+                hdf[f'pyramid/{level}/time'][()],
+                pd.Series(time).groupby(buckets).mean(),
+            )
+            for group_name, channel in [
+                ('t_ist_h1', 'T Ist H1'),
+                ('p_ist_h1', 'P Ist H1'),
+                ('t12', 'T12'),
+            ]:
+                group = hdf[f'pyramid/{level}/{group_name}']
+                assert group.attrs['signal'] == 'mean'
+                assert group['time'] == hdf[f'pyramid/{level}/time']
+                expected = (
+                    df_csv[f'{channel} ValueY']
+                    .groupby(buckets)
+                    .agg(['min', 'max', 'mean'])
+                )
+                if group_name == 't12':
+                    for statistic in ['min', 'max', 'mean']:
+                        assert group[statistic].dtype == np.float32
+                        np.testing.assert_allclose(
+                            group[statistic][()], expected[statistic], atol=0.05
+                        )
+                    continue
+                for statistic in ['min', 'max']:
+                    np.testing.assert_array_equal(
+                        group[statistic][()], expected[statistic]
+                    )
+                np.testing.assert_allclose(
+                    group['mean'][()], expected['mean'], rtol=1e-12
+                )
@@ -0,0 +1,190 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import zipfile
+
+import numpy as np
+import pytest
+from nomad.datamodel import EntryArchive
+from nomad.utils import get_logger
+
+from nomad_ikz_plugin.movpe.movpe1.rcp.parser import (
+    RCP_CHANNELS,
+    ParserMovpe1RcpIKZ,
+    read_rcp_channels,
+)
+from nomad_ikz_plugin.utils import archive_file_type, deserialize_archive
+
+data_dir = os.path.join(os.path.dirname(__file__), 'data/movpe/movpe1')
+rcp_zip = os.path.join(data_dir, 'rcp_file+growth_excel_file/CompleteTest(A, B).zip')
+rcp_file = 'CompleteTest(A, B)/23-02-07-MA-10-CTO/Software file/(Sr-Ca)O2-FE220-01.rcp'
+
+CUBIC_CENTIMETER_PER_MINUTE = 1e-6 / 60
+CELSIUS_ZERO = 273.15
+RCP_QUANTITIES = {
+    # channel id: (path of the quantity in the step, conversion of the set value)
+    '3': (
+        ['environment', 'uniform_gas_flow_rate'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '6': (
+        ['sources', 0, 'vapor_source', 'total_flow_rate'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '9': (
+        ['sources', 1, 'vapor_source', 'carrier_push_flow_rate'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '12': (
+        ['sources', 1, 'vapor_source', 'carrier_purge_flow_rate'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '28': (
+        ['sources', 2, 'vapor_source', 'carrier_push_flow_rate'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '31': (
+        ['sources', 2, 'vapor_source', 'carrier_purge_flow_rate'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '34': (
+        ['sources', 1, 'peristaltic_pump_flux'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '36': (
+        ['sources', 2, 'peristaltic_pump_flux'],
+        lambda value: value * CUBIC_CENTIMETER_PER_MINUTE,
+    ),
+    '17': (
+        ['sample_parameters', 0, 'filament_temperature'],
+        lambda value: value + CELSIUS_ZERO,
+    ),
+    '19': (
+        ['sample_parameters', 0, 'shaft_temperature'],
+        lambda value: value + CELSIUS_ZERO,
+    ),
+    '21': (['environment', 'rotation'], lambda value: value),
+    '15': (
+        ['sources', 1, 'vapor_source', 'temperature'],
+        lambda value: value + CELSIUS_ZERO,
+    ),
+    '26': (
+        ['sources', 2, 'vapor_source', 'temperature'],
+        lambda value: value + CELSIUS_ZERO,
+    ),
+    '23': (['environment', 'pressure'], lambda value: value * 100),
+}
+
+
+def parse_rcp(directory, upload_context, lines=None) -> dict:
+    """
+    Extracts the recipe file of the test upload to the directory, replacing its lines
+    if given, and parses it. Returns the data of the growth archive.
+    """
+    with zipfile.ZipFile(rcp_zip) as upload:
+        upload.extract(rcp_file, directory)
+    mainfile = os.path.join(directory, rcp_file)
+    if lines is not None:
+        with open(mainfile, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines))
+    context = upload_context(directory)
+    ParserMovpe1RcpIKZ().parse(
+        mainfile, EntryArchive(m_context=context), get_logger(__name__)
+    )
+    (archive_file,) = [name for name in os.listdir(directory) if '.archive.' in name]
+    with open(os.path.join(directory, archive_file), encoding='utf-8') as file:
+        return deserialize_archive(file.read(), archive_file_type(archive_file))['data']
+
+
+def recipe_lines() -> list[str]:
+    with zipfile.ZipFile(rcp_zip) as upload:
+        return upload.read(rcp_file).decode().splitlines()
+
+
+def step_quantity(step: dict, path: list):
+    for key in path:
+        step = step[key]
+    return step
+
+
+def test_rcp_parser(tmp_path, upload_context):
+    """
+    Tests that the set values of every channel of the recipe are converted and set in
+    the quantity of each step with the start time of the step.
+    """
+    assert RCP_QUANTITIES.keys() == RCP_CHANNELS.keys()
+    lines = recipe_lines()
+    durations = [int(duration) for duration in lines[1].split()]
+    set_times = np.cumsum([0, *durations[:-1]])
+    set_values = {
+        lines[index].split()[0]: [int(value) / 10 for value in lines[index + 1].split()]
+        for index in range(3, len(lines) - 3, 4)
+    }
+
+    growth = parse_rcp(tmp_path, upload_context)
+    assert growth['lab_id'] == '23-02-07-MA-10-CTO'
+    assert len(growth['steps']) == int(lines[0].split()[0]) == 16
+    for channel_id, (path, convert) in RCP_QUANTITIES.items():
+        for step, set_time, set_value in zip(
+            growth['steps'], set_times, set_values[channel_id]
+        ):
+            quantity = step_quantity(step, path)
+            assert quantity['set_time'] == [set_time], channel_id
+            assert quantity['set_value'] == pytest.approx([convert(set_value)]), (
+                channel_id
+            )
+
+
+def test_rcp_parser_short_channel(tmp_path, upload_context):
+    """
+    Tests that the steps missing in the set values of a channel are left unset.
+    """
+    lines = recipe_lines()
+    assert lines[3].split()[0] == '3'
+    set_values = [int(value) / 10 for value in lines[4].split()[:10]]
+    lines[4] = ' '.join(lines[4].split()[:10])
+    growth = parse_rcp(tmp_path, upload_context, lines)
+    for step, set_value in zip(growth['steps'][:10], set_values):
+        assert step['environment']['uniform_gas_flow_rate']['set_value'] == (
+            pytest.approx([set_value * CUBIC_CENTIMETER_PER_MINUTE])
+        )
+    for step in growth['steps'][10:]:
+        assert 'uniform_gas_flow_rate' not in step['environment']
+        assert 'pressure' in step['environment']
+
+
+def test_read_rcp_channels():
+    """
+    Tests that only the channels of `RCP_CHANNELS` are read, that the set values are
+    divided by 10 and that the steps missing in a channel are NaN.
+    """
+    lines = [
+        *['3  False', '10 20 30', '0 0 0', '0 0 0'],
+        *['25  False', '1 2 3', '0 0 0', '0 0 0'],
+        *['17  False', '250', '0 0 0', '0 0 0'],
+        *['6  False', '1 2 3 4', '0 0 0', '0 0 0'],
+        # reading stops at the incomplete channel
+        *['23  False', '', '0 0 0', '0 0 0'],
+        *['21  False', '1 2 3', '0 0 0', '0 0 0'],
+    ]
+    channel_ids, values = read_rcp_channels(lines, 3)
+    assert channel_ids == ['3', '17', '6']
+    np.testing.assert_array_equal(
+        values, [[1, 2, 3], [25, np.nan, np.nan], [0.1, 0.2, 0.3]]
+    )
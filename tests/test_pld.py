@@ -0,0 +1,229 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+from types import SimpleNamespace
+
+import h5py
+import numpy as np
+import pandas as pd
+from nomad.datamodel import EntryArchive, EntryMetadata
+from nomad.utils import get_logger
+
+from nomad_ikz_plugin.pld.schema import (
+    DLOG_COLUMNS,
+    ELOG_COLUMNS,
+    IKZPLDSubstrate,
+    IKZPulsedLaserDeposition,
+    RoughParallelepiped,
+    configuration,
+    elog_steps,
+    hash_raw_files,
+    read_dlog,
+    step_windows,
+)
+
+data_dir = os.path.join(os.path.dirname(__file__), 'data/pld')
+
+
+def test_read_dlog():
+    """
+    Tests that the dlog is read into float64 column arrays.
+    """
+    data = read_dlog(
+        os.path.join(data_dir, '26042023_1630-STO-SAO-STO-Alev.dlog'),
+    )
+    assert list(data) == DLOG_COLUMNS
+    assert all(column.dtype == np.float64 for column in data.values())
+    assert all(len(column) == 7626 for column in data.values())
+    assert data['time_s'][0] == 15.2
+    assert data['pressure1_mbar'][0] == 1.525e-5
+
+
+def test_step_windows():
+    """
+    Tests that the step windows select the same rows as boolean masks.
+    """
+    time_s = np.array([0.0, 1.0, 1.0, 2.5, 3.0, 4.0, 7.0])
+    start_s = np.array([0.0, 1.0, 3.0, 5.0, 6.5])
+    end_s = np.array([1.0, 3.0, 5.0, 6.0, 10.0])
+    for start, end, window in zip(start_s, end_s, step_windows(time_s, start_s, end_s)):
+        mask = (start <= time_s) & (time_s < end)
+        np.testing.assert_array_equal(time_s[window], time_s[mask])
+
+
+def test_elog_steps():
+    """
+    Tests that the steps are extracted from an elog with aborted and malformed lines.
+    """
+    df_recipe = pd.DataFrame(
+        [
+            ['0:0:14', 'Starting Evacuation Recipe'],
+            ['0:10:31', 'Starting Process with Recipe :heatSAO500'],
+            ['0:35:46', '0 Laser-pulse fired on target'],
+            ['0:35:46', 'Event completed'],
+            ['0:36:2', 'Starting Process with Recipe :depoSAO700'],
+            ['0:36:10', 'Abort Button pressed'],
+            ['0:39:2', '330 Laser-pulse fired on target'],
+            ['0:39:2', 'Event completed'],
+            ['0:39:x', 'Event completed'],
+            ['0:40:0', 'Starting Process with Recipe :cool20'],
+            ['1:0:0', 'Shutting down system'],
+        ],
+        columns=ELOG_COLUMNS,
+    )
+    df_steps, end_s = elog_steps(df_recipe)
+    assert df_steps['recipe'].tolist() == ['heatSAO500', 'depoSAO700', 'cool20']
+    assert df_steps['time_s'].tolist() == [631, 2162, 2400]
+    assert df_steps['duration_s'].tolist() == [1515, 180, 1200]
+    assert df_steps['pulses'].tolist() == [0, 330, 0]
+    assert df_steps['target'].tolist() == ['SAO', 'SAO', '']
+    assert df_steps['temperature_degc'].tolist() == [500, 700, 20]
+    assert end_s == 3600
+
+
+def test_hash_raw_files(tmp_path, upload_context):
+    """
+    Tests that moving bytes from one log to the other changes the hash.
+    """
+    archive = SimpleNamespace(m_context=upload_context(tmp_path))
+    hashes = set()
+    for elog, dlog in [(b'ab', b'cd'), (b'a', b'bcd'), (b'abc', b'd')]:
+        (tmp_path / 'test.elog').write_bytes(elog)
+        (tmp_path / 'test.dlog').write_bytes(dlog)
+        hashes.add(hash_raw_files(archive, ['test.elog', 'test.dlog']))
+    assert len(hashes) == 3
+
+
+def test_changed_layer_archive(tmp_path, upload_context):
+    """
+    Tests that editing the thickness of one layer only rewrites the archive of that
+    layer.
+    """
+    for log in [
+        '26042023_1630-STO-SAO-STO-Alev.dlog',
+        '26042023_1630-STO-SAO-STO-Alev.elog',
+    ]:
+        shutil.copy(os.path.join(data_dir, log), tmp_path)
+    context = upload_context(tmp_path)
+    substrate = IKZPLDSubstrate(
+        lab_id='substrate',
+        geometry=RoughParallelepiped(width=5e-3, length=5e-3),
+    )
+    substrate.m_proxy_value = '../upload/archive/substrate#data'
+    process = IKZPulsedLaserDeposition(
+        data_log='26042023_1630-STO-SAO-STO-Alev.dlog',
+        recipe_log='26042023_1630-STO-SAO-STO-Alev.elog',
+        substrate=substrate,
+        target_distances=[0.05],
+        _thicknesses=[10.0, 20.0],
+    )
+    logger = get_logger(__name__)
+
+    def normalize():
+        archive = EntryArchive(
+            m_context=context, metadata=EntryMetadata(upload_id=context.upload_id)
+        )
+        archive.data = process
+        process.normalize(archive, logger)
+        return {
+            file_name: (tmp_path / file_name).read_text()
+            for file_name in os.listdir(tmp_path)
+            if file_name.endswith('.archive.json')
+        }
+
+    before = normalize()
+    layers = sorted(file_name for file_name in before if '-L' in file_name)
+    assert len(layers) == 2
+    context.processed = []
+    process._thicknesses = [10.0, 25.0]
+    after = normalize()
+    assert [name for name in before if before[name] != after[name]] == [layers[1]]
+    assert context.processed == [(layers[1], True)]
+
+
+def normalized_steps(directory, upload_context):
+    """
+    Normalizes a PLD process of the test logs copied to `directory` and returns its
+    steps.
+    """
+    directory.mkdir()
+    for log in [
+        '26042023_1630-STO-SAO-STO-Alev.dlog',
+        '26042023_1630-STO-SAO-STO-Alev.elog',
+    ]:
+        shutil.copy(os.path.join(data_dir, log), directory)
+    context = upload_context(directory)
+    process = IKZPulsedLaserDeposition(
+        data_log='26042023_1630-STO-SAO-STO-Alev.dlog',
+        recipe_log='26042023_1630-STO-SAO-STO-Alev.elog',
+    )
+    archive = EntryArchive(
+        m_context=context, metadata=EntryMetadata(upload_id=context.upload_id)
+    )
+    archive.data = process
+    process.normalize(archive, get_logger(__name__))
+    return process.steps
+
+
+def step_time_series(step):
+    """
+    Returns the time series sections of a PLD step by the name of their HDF5 dataset.
+    """
+    return {
+        'laser_power': step.sources[0].vapor_source.power,
+        'pressure': step.environment.pressure,
+        'oxygen_flow': step.environment.gas_flow[0].flow_rate,
+        'argon_nitrogen_flow': step.environment.gas_flow[1].flow_rate,
+        'substrate_temperature': step.sample_parameters[0].substrate_temperature,
+    }
+
+
+def test_hdf5_time_series(tmp_path, upload_context, monkeypatch):
+    """
+    Tests that the HDF5 references of the steps resolve to the same arrays as the
+    inline time series.
+    """
+    inline_steps = normalized_steps(tmp_path / 'inline', upload_context)
+    monkeypatch.setattr(configuration, 'hdf5_time_series', True)
+    hdf5_steps = normalized_steps(tmp_path / 'hdf5', upload_context)
+    hdf_file = tmp_path / 'hdf5' / '26042023_1630-STO-SAO-STO-Alev.h5'
+
+    assert len(hdf5_steps) == len(inline_steps) > 0
+    with h5py.File(hdf_file, 'r') as h5:
+        process_time = h5['/process/time'][:]
+        for index, (inline_step, hdf5_step) in enumerate(zip(inline_steps, hdf5_steps)):
+            hdf5_path = f'/uploads/test_upload/raw/{hdf_file.name}#/steps/{index}'
+            step_time = h5[f'/steps/{index}/time'][:]
+            start = np.searchsorted(process_time, step_time[0])
+            window = slice(start, start + len(step_time))
+            np.testing.assert_array_equal(step_time, process_time[window])
+            inline_series = step_time_series(inline_step)
+            for name, series in step_time_series(hdf5_step).items():
+                assert series.value == f'{hdf5_path}/{name}'
+                assert series.time == f'{hdf5_path}/time'
+                values = h5[series.value.split('#', 1)[1]][:]
+                np.testing.assert_array_equal(values, h5[f'/process/{name}'][window])
+                np.testing.assert_allclose(
+                    values, inline_series[name].value.magnitude, equal_nan=True
+                )
+                np.testing.assert_allclose(
+                    h5[series.time.split('#', 1)[1]][:],
+                    inline_series[name].time.magnitude,
+                )
@@ -0,0 +1,337 @@
+#
+# Copyright The NOMAD Authors.
+#
+# This file is part of NOMAD. See https://nomad-lab.eu for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import yaml
+from nomad.datamodel.context import ClientContext
+
+from nomad_ikz_plugin import utils
+from nomad_ikz_plugin.utils import (
+    ArchiveBatch,
+    archive_content_equal,
+    archive_file_type,
+    create_archive,
+    deserialize_archive,
+    dict_nan_equal,
+    get_hash_ref,
+    min_max_indices,
+    poll_until,
+    search_lab_ids,
+    serialize_archive,
+    wait_for_entries,
+)
+
+
+@pytest.mark.parametrize(
+    'file_type, dump',
+    [
+        pytest.param('json', json.dumps, id='json'),
+        pytest.param('yaml', yaml.safe_dump, id='yaml'),
+    ],
+)
+def test_nan_archive_round_trip(tmp_path, upload_context, file_type, dump):
+    """
+    Tests that an archive with a NaN-valued quantity equals the archive read back from
+    its serialization and that recreating an existing archive with NaN values logs no
+    error.
+    """
+    entry_dict = {
+        'data': {
+            'name': 'step',
+            'duration': float('nan'),
+            'values': [1.0, float('nan')],
+        }
+    }
+    content = serialize_archive(entry_dict, file_type)
+    assert dict_nan_equal(deserialize_archive(content, file_type), entry_dict)
+
+    file_name = f'step.archive.{file_type}'
+    with open(tmp_path / file_name, 'w') as file:
+        file.write(dump(entry_dict))
+    context = upload_context(tmp_path)
+    assert archive_content_equal(context, file_name, content)
+
+    logger = MagicMock()
+    create_archive(entry_dict, context, file_name, file_type, logger)
+    logger.error.assert_not_called()
+    assert context.processed == [(file_name, True)]
+    with open(tmp_path / file_name) as file:
+        assert dict_nan_equal(deserialize_archive(file.read(), file_type), entry_dict)
+
+
+def test_nan_archive_numpy():
+    """
+    Tests that NaN values of numpy arrays equal the values read back from a json
+    archive.
+    """
+    entry_dict = {'data': {'values': np.array([1.0, np.nan])}}
+    content = serialize_archive(entry_dict, 'json')
+    assert dict_nan_equal(
+        deserialize_archive(content, 'json'), {'data': {'values': [1.0, np.nan]}}
+    )
+
+
+class FakeClock:
+    """
+    A clock that only advances while sleeping, recording the sleeps.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(name='clock')
+def fixture_clock(monkeypatch):
+    """
+    Replaces the clock of the polling functions with a `FakeClock`.
+    """
+    clock = FakeClock()
+    monkeypatch.setattr(utils, 'time', clock)
+    return clock
+
+
+def search_archive(context):
+    """
+    Returns an archive with the context and main author needed for a search.
+    """
+    return SimpleNamespace(
+        m_context=context,
+        metadata=SimpleNamespace(main_author=SimpleNamespace(user_id='test_user')),
+    )
+
+
+def test_poll_until(clock):
+    """
+    Tests that the check is polled with exponentially increasing delays until it
+    returns a truthy value or the timeout is exceeded.
+    """
+    results = iter([0, None, 0, 3])
+    assert poll_until(lambda: next(results)) == 3
+    assert clock.sleeps == [0.05, 0.1, 0.2]
+
+    clock.sleeps.clear()
+    assert poll_until(lambda: False, timeout=4.0) is False
+    assert clock.sleeps == pytest.approx([0.05, 0.1, 0.2, 0.4, 0.8, 1.0, 1.0, 0.45])
+    assert clock.now == pytest.approx(4.35)
+
+
+def test_wait_for_entries(tmp_path, upload_context, clock, monkeypatch):
+    """
+    Tests that the search index is polled until all entries are indexed, that a
+    timeout is logged and that nothing is searched for a `ClientContext`.
+    """
+    queries = []
+    indexed = iter([0, 1, 2])
+
+    def search(owner, query, pagination, user_id):
+        queries.append(query)
+        return SimpleNamespace(pagination=SimpleNamespace(total=next(indexed, 1)))
+
+    monkeypatch.setitem(
+        sys.modules,
+        'nomad.search',
+        SimpleNamespace(search=search, MetadataPagination=SimpleNamespace),
+    )
+    archive = search_archive(upload_context(tmp_path))
+    logger = MagicMock()
+    assert wait_for_entries(archive, ['b', 'a', 'a'], logger)
+    assert queries == [{'entry_id:any': ['a', 'b']}] * 3
+    logger.warning.assert_not_called()
+
+    assert not wait_for_entries(archive, ['a', 'b'], logger)
+    logger.warning.assert_called_once()
+
+    queries.clear()
+    archive = search_archive(MagicMock(spec=ClientContext))
+    assert wait_for_entries(archive, ['a'], logger)
+    assert queries == []
+
+
+def entry(entry_id, lab_id):
+    return {'entry_id': entry_id, 'results': {'eln': {'lab_ids': [lab_id]}}}
+
+
+def test_search_lab_ids(tmp_path, upload_context, clock, monkeypatch):
+    """
+    Tests that the search is repeated until an entry was found for every lab_id or no
+    new entries were found for the settle time, so that a lab_id without entries does
+    not delay the search until the timeout.
+    """
+    polls = []
+
+    def search_iterator(owner, query, user_id):
+        polls.append(query)
+        return snapshots[min(len(polls), len(snapshots)) - 1]
+
+    monkeypatch.setitem(
+        sys.modules, 'nomad.search', SimpleNamespace(search_iterator=search_iterator)
+    )
+    archive = search_archive(upload_context(tmp_path))
+    logger = MagicMock()
+    snapshots = [[], [entry('a1', 'A')], [entry('a1', 'A'), entry('b1', 'B')]]
+    search_results = search_lab_ids(archive, {}, ['A', 'B'], logger)
+    assert search_results == {'A': [entry('a1', 'A')], 'B': [entry('b1', 'B')]}
+    assert len(polls) == 3
+    assert polls[0] == {'results.eln.lab_ids:any': ['A', 'B']}
+
+    # the sample C has no recipe, the entry of B is found in the third poll at 0.15 s
+    polls.clear()
+    clock.now = 0.0
+    search_results = search_lab_ids(archive, {}, ['A', 'B', 'C'], logger)
+    assert search_results['C'] == []
+    assert 0.15 + utils.INDEXING_SETTLE_TIME <= clock.now
+    assert clock.now < 0.15 + 2 * utils.INDEXING_SETTLE_TIME
+    logger.warning.assert_not_called()
+
+    # entries are still found when the timeout is exceeded
+    polls.clear()
+    clock.now = 0.0
+    snapshots = [[entry(f'a{i}', 'A') for i in range(poll)] for poll in range(100)]
+    search_lab_ids(archive, {}, ['A', 'B'], logger)
+    assert clock.now == pytest.approx(utils.INDEXING_TIMEOUT)
+    logger.warning.assert_called_once()
+
+    polls.clear()
+    archive = search_archive(MagicMock(spec=ClientContext))
+    assert search_lab_ids(archive, {}, ['A'], logger) == {'A': []}
+    assert polls == []
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_archive_batch(tmp_path, upload_context, max_workers):
+    """
+    Tests that an `ArchiveBatch` writes new archives and, with `overwrite`, changed
+    ones, leaves identical and other changed archives untouched and processes the
+    written archives in the order they were added.
+    """
+    existing = {
+        'unchanged.archive.json': {'name': 'unchanged'},
+        'modified.archive.json': {'name': 'modified before'},
+        'overwritten.archive.yaml': {'name': 'overwritten before'},
+    }
+    for file_name, data in existing.items():
+        with open(tmp_path / file_name, 'w') as file:
+            file.write(serialize_archive({'data': data}, archive_file_type(file_name)))
+    context = upload_context(tmp_path)
+    archive = SimpleNamespace(
+        m_context=context, metadata=SimpleNamespace(upload_id=context.upload_id)
+    )
+    batch = ArchiveBatch(archive, max_workers=max_workers)
+    entities = {
+        'written_0.archive.json': ({'name': 'written 0'}, False),
+        'unchanged.archive.json': ({'name': 'unchanged'}, False),
+        'modified.archive.json': ({'name': 'modified after'}, False),
+        'overwritten.archive.yaml': ({'name': 'overwritten after'}, True),
+        **{
+            f'written_{index}.archive.yaml': ({'name': f'written {index}'}, True)
+            for index in range(1, 6)
+        },
+    }
+    for file_name, (entity, overwrite) in entities.items():
+        reference = batch.add(entity, file_name, overwrite=overwrite)
+        assert reference == get_hash_ref(context.upload_id, file_name)
+    assert context.processed == []
+
+    logger = MagicMock()
+    written_files = batch.write(logger)
+
+    expected = [
+        file_name
+        for file_name in entities
+        if file_name.startswith(('written', 'overwritten'))
+    ]
+    assert written_files == expected
+    assert context.processed == [
+        (file_name, file_name == 'overwritten.archive.yaml') for file_name in expected
+    ]
+    for file_name, (entity, _) in entities.items():
+        with open(tmp_path / file_name) as file:
+            data = deserialize_archive(file.read(), archive_file_type(file_name))
+        if file_name == 'modified.archive.json':
+            entity = existing[file_name]
+        assert data == {'data': entity}
+    logger.warning.assert_called_once()
+    assert 'modified.archive.json' in logger.warning.call_args.args[0]
+    assert batch.entities == {}
+
+
+def test_archive_batch_client_context():
+    """
+    Tests that an `ArchiveBatch` adds and writes nothing for a `ClientContext`.
+    """
+    archive = SimpleNamespace(m_context=MagicMock(spec=ClientContext))
+    batch = ArchiveBatch(archive)
+    assert batch.add({'name': 'entity'}, 'entity.archive.json') is None
+    assert batch.write() == []
+    archive.m_context.raw_file.assert_not_called()
+    archive.m_context.process_updated_raw_file.assert_not_called()
+
+
+@pytest.mark.parametrize('length', [5, 1000, 1001, 12345])
+@pytest.mark.parametrize('max_points', [4, 5, 100, 1000])
+def test_min_max_indices(length, max_points):
+    """
+    Tests that the downsampled series keeps its first and last point and the extrema
+    within the point budget and that shorter series are returned whole.
+    """
+    values = np.random.default_rng(0).normal(size=length)
+    indices = min_max_indices(values, max_points)
+    if length <= max_points:
+        np.testing.assert_array_equal(indices, np.arange(length))
+        return
+    assert len(indices) <= max_points
+    assert np.all(np.diff(indices) > 0)
+    assert indices[0] == 0
+    assert indices[-1] == length - 1
+    assert np.argmin(values) in indices
+    assert np.argmax(values) in indices
+
+
+def test_min_max_indices_nan():
+    """
+    Tests that NaN values are skipped and that buckets with only NaN values keep valid
+    indices.
+    """
+    values = np.arange(100, dtype=float)
+    values[10:60] = np.nan
+    values[70] = 1000.0
+    with np.errstate(invalid='raise'):
+        indices = min_max_indices(values, 12)
+    assert len(indices) <= 12
+    assert np.all((indices >= 0) & (indices < len(values)))
+    assert indices[0] == 0
+    assert indices[-1] == len(values) - 1
+    assert 70 in indices
+    all_nan = min_max_indices(np.full(50, np.nan), 10)
+    assert all_nan[0] == 0
+    assert all_nan[-1] == 49
+    assert len(all_nan) <= 10